@@ -1,14 +1,43 @@
-from __future__ import absolute_import
+import importlib
+from typing import Any
 
 from aiosupabase.utils.config import SupabaseSettings, settings
 from aiosupabase.types.errors import (
     SupabaseException,
 )
 
-from aiosupabase.schemas.auth import SupabaseAuthClient
-from aiosupabase.schemas.pgrest import SupabasePostgrestClient
-from aiosupabase.schemas.rt import SupabaseRealtimeClient
-from aiosupabase.schemas.storage import SupabaseStorageClient
-from aiosupabase.schemas.funcs import FunctionsClient
+"""
+Lazy re-exports so that the sub-clients (and their gotrue / postgrest /
+realtime / httpx dependencies) are only loaded on first access.
+"""
 
-from aiosupabase.client import SupabaseClient, SupabaseAPI, Supabase
+_lazy_imports = {
+    "SupabaseAuthClient": "aiosupabase.schemas.auth",
+    "SupabasePostgrestClient": "aiosupabase.schemas.pgrest",
+    "SupabaseRealtimeClient": "aiosupabase.schemas.rt",
+    "SupabaseStorageClient": "aiosupabase.schemas.storage",
+    "FunctionsClient": "aiosupabase.schemas.funcs",
+    "InvokeOptions": "aiosupabase.schemas.funcs",
+    "SupabaseClient": "aiosupabase.client",
+    "SupabaseAPI": "aiosupabase.client",
+    "Supabase": "aiosupabase.client",
+}
+
+__all__ = [
+    "SupabaseSettings",
+    "settings",
+    "SupabaseException",
+    *_lazy_imports,
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_lazy_imports[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
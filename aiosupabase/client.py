@@ -1,28 +1,45 @@
+from __future__ import annotations
 
-from aiosupabase.schemas import *
+import hmac
+import asyncio
 from aiosupabase.utils.config import SupabaseSettings
 from aiosupabase.utils.config import settings as sb_settings
-from gotrue.types import (
-    CookieOptions,
-)
-from postgrest import (
-    SyncFilterRequestBuilder, 
-    SyncRequestBuilder,
-    AsyncRequestBuilder,
-    AsyncFilterRequestBuilder,
-    
-)
-from gotrue import (
-    CookieOptions,
-    SyncGoTrueAPI,
-    SyncSupportedStorage,
-    AsyncGoTrueAPI,
-    AsyncSupportedStorage,
-)
-from realtime.connection import Socket
-from typing import Dict, Optional, Union, Any
+from aiosupabase.utils import logger
+from aiosupabase.utils.helpers import cached_property, close_transports, aclose_transports, _closing_tasks
+from typing import Dict, Optional, Union, Any, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+    from aiosupabase.schemas.auth import SupabaseAuthClient
+    from aiosupabase.schemas.pgrest import SupabasePostgrestClient
+    from aiosupabase.schemas.rt import SupabaseRealtimeClient
+    from aiosupabase.schemas.storage import SupabaseStorageClient
+    from aiosupabase.schemas.funcs import FunctionsClient
+    from postgrest import (
+        SyncFilterRequestBuilder, 
+        SyncRequestBuilder,
+        AsyncRequestBuilder,
+        AsyncFilterRequestBuilder,
+    )
+    from gotrue import (
+        CookieOptions,
+        SyncGoTrueAPI,
+        SyncSupportedStorage,
+        AsyncGoTrueAPI,
+        AsyncSupportedStorage,
+    )
+    from realtime.connection import Socket
 
 class SupabaseClient:
+
+    __slots__ = (
+        "settings", "url", "key", "default_headers", "_auth", "_auth_options",
+        "_schema", "_timeout", "_default_schema", "_realtime_url", "_last_auth",
+        "_transport", "_async_transport", "_socket", "_realtime_clients",
+        "_postgrest", "_storage", "_functions",
+        # holds the postgrest methods bound in `postgrest`
+        "__dict__",
+    )
     
     def __init__(
         self,
@@ -47,40 +64,38 @@ class SupabaseClient:
         """
         The Supabase Client
         """
-        self.settings = settings if settings is None else sb_settings
-        self.url = url if url is not None else self.settings.url
-        self.key = key if key is not None else self.settings.key
-        self.default_headers = headers if headers is not None else self.settings.default_headers
+        self.settings = settings = settings if settings is not None else sb_settings
+        self.url = url if url is not None else settings.url
+        self.key = key if key is not None else settings.key
+        self.default_headers = headers if headers is not None else settings.default_headers
 
         # These will be set from the settings per app
-        self.auth: SupabaseAuthClient = SupabaseAuthClient(
-            auto_refresh_token = auto_refresh_token,
-            persist_session = persist_session,
-            cookie_options = cookie_options,
-            replace_default_headers = replace_default_headers,
-
-            api = api,
-            local_storage = local_storage,
-
-            async_api = async_api,
-            async_local_storage = async_local_storage,
-            settings = self.settings,
-        )
-        self.socket = Socket(
-            url = self.settings.realtime_url,
-        )
-        self._realtime_clients: Dict[str, SupabaseRealtimeClient] = {}
-        self.postgrest: SupabasePostgrestClient = SupabasePostgrestClient(
-            schema = schema,
-            timeout = timeout,
-            settings = self.settings,
-        )
-        self._storage: SupabaseStorageClient = SupabaseStorageClient(
-            settings = self.settings,
-        )
-        self._functions: FunctionsClient = FunctionsClient(
-            settings = self.settings,
-        )
+        self._auth_options: Dict[str, Any] = {
+            "auto_refresh_token": auto_refresh_token,
+            "persist_session": persist_session,
+            "cookie_options": cookie_options,
+            "replace_default_headers": replace_default_headers,
+            "api": api,
+            "local_storage": local_storage,
+            "async_api": async_api,
+            "async_local_storage": async_local_storage,
+        }
+        self._default_schema = settings.client_schema
+        self._schema = schema if schema is not None else self._default_schema
+        self._timeout = timeout if timeout is not None else settings.timeout
+        self._realtime_url = settings.realtime_url
+        self._last_auth: Optional[Tuple[str, Union[str, bytes, None], Union[str, bytes]]] = None
+
+        # Lazy Initialization
+        self._auth: SupabaseAuthClient = None
+        self._transport: httpx.HTTPTransport = None
+        self._async_transport: httpx.AsyncHTTPTransport = None
+        self._socket: Socket = None
+        # held strongly, the socket keeps each channel for its lifetime anyway
+        self._realtime_clients: Dict[Tuple[str, str], SupabaseRealtimeClient] = {}
+        self._postgrest: SupabasePostgrestClient = None
+        self._storage: SupabaseStorageClient = None
+        self._functions: FunctionsClient = None
     
     def set_auth(
         self, 
@@ -96,17 +111,112 @@ class SupabaseClient:
         token : str
             the new jwt token sent in the authorisation header
         """
+        if self._last_auth is not None and self._last_auth[1:] == (username, password):
+            last_token = self._last_auth[0]
+            if isinstance(token, str) and isinstance(last_token, str):
+                if hmac.compare_digest(last_token.encode(), token.encode()): return
+            elif last_token == token: return
 
         self.postgrest.auth(token = token, username = username, password = password)
         self.auth.set_auth(access_token = token)
-        self._functions.set_auth(token = token)
+        self.functions.set_auth(token = token)
+        self._last_auth = (token, username, password)
+
+    @property
+    def transport(self) -> httpx.HTTPTransport:
+        """
+        The connection pool shared by the sync sub-clients
+        """
+        if self._transport is None:
+            import httpx
+            self._transport = httpx.HTTPTransport(
+                limits = self.settings.limits,
+                http2 = self.settings.http2_enabled,
+            )
+        return self._transport
+    
+    @property
+    def async_transport(self) -> httpx.AsyncHTTPTransport:
+        """
+        The connection pool shared by the async sub-clients
+        """
+        if self._async_transport is None:
+            import httpx
+            self._async_transport = httpx.AsyncHTTPTransport(
+                limits = self.settings.limits,
+                http2 = self.settings.http2_enabled,
+            )
+        return self._async_transport
+
+    @property
+    def auth(self) -> SupabaseAuthClient:
+        if self._auth is None:
+            from aiosupabase.schemas.auth import SupabaseAuthClient
+            self._auth = SupabaseAuthClient(
+                **self._auth_options,
+                headers = self.default_headers.copy(),
+                settings = self.settings,
+                transport = self.transport,
+                async_transport = self.async_transport,
+            )
+        return self._auth
+
+    @property
+    def socket(self) -> Socket:
+        if self._socket is None:
+            from realtime.connection import Socket
+            self._socket = Socket(
+                url = self._realtime_url,
+            )
+        return self._socket
+
+    @property
+    def postgrest(self) -> SupabasePostgrestClient:
+        if self._postgrest is None:
+            from aiosupabase.schemas.pgrest import SupabasePostgrestClient
+            self._postgrest = SupabasePostgrestClient(
+                url = self.settings.rest_url,
+                key = self.key,
+                headers = self.default_headers.copy(),
+                schema = self._schema,
+                timeout = self._timeout,
+                settings = self.settings,
+                transport = self.transport,
+                async_transport = self.async_transport,
+            )
+            # Shadow the forwarding methods below with the postgrest ones
+            self.from_ = self.table = self._postgrest.from_
+            self.afrom_ = self.atable = self._postgrest.afrom_
+            self.rpc = self._postgrest.rpc
+            self.async_rpc = self._postgrest.async_rpc
+        return self._postgrest
     
     @property
     def functions(self) -> FunctionsClient:
+        if self._functions is None:
+            from aiosupabase.schemas.funcs import FunctionsClient
+            self._functions = FunctionsClient(
+                url = self.settings.functions_url,
+                key = self.key,
+                headers = self.default_headers.copy(),
+                settings = self.settings,
+                transport = self.transport,
+                async_transport = self.async_transport,
+            )
         return self._functions
     
     @property
     def storage(self) -> SupabaseStorageClient:
+        if self._storage is None:
+            from aiosupabase.schemas.storage import SupabaseStorageClient
+            self._storage = SupabaseStorageClient(
+                url = self.settings.storage_url,
+                key = self.key,
+                headers = self.default_headers.copy(),
+                settings = self.settings,
+                transport = self.transport,
+                async_transport = self.async_transport,
+            )
         return self._storage
     
     def realtime(self, table_name: Optional[str] = "*", schema: Optional[str] = None) -> SupabaseRealtimeClient:
@@ -122,14 +232,16 @@ class SupabaseClient:
         -------
         SupabaseRealtimeClient
         """
-        if schema is None: schema = self.settings.client_schema
-        if table_name not in self._realtime_clients:
-            self._realtime_clients[table_name] = SupabaseRealtimeClient(
+        if schema is None: schema = self._default_schema
+        client = self._realtime_clients.get((table_name, schema))
+        if client is None:
+            from aiosupabase.schemas.rt import SupabaseRealtimeClient
+            client = self._realtime_clients[(table_name, schema)] = SupabaseRealtimeClient(
                 socket = self.socket,
                 schema = schema,
                 table_name = table_name,
             )
-        return self._realtime_clients[table_name]
+        return client
 
     def from_(self, table_name: str) -> SyncRequestBuilder:
         """Perform a table operation.
@@ -200,16 +312,31 @@ class SupabaseClient:
     """
 
     async def aclose(self):
-        await self.postgrest.aclose()
-        await self.auth.aclose()
-        await self.storage.aclose()
-        await self.functions.aclose()
+        self._last_auth = None
+        clients = [
+            client for client in (self._postgrest, self._auth, self._storage, self._functions) 
+            if client is not None
+        ]
+        results = await asyncio.gather(
+            *[client.aclose() for client in clients],
+            return_exceptions = True,
+        )
+        # the pools are shared by the sub-clients, which leave them open, so they are closed once here
+        transports, self._transport, self._async_transport = (self._transport, self._async_transport), None, None
+        await aclose_transports(*transports)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        for error in errors[1:]:
+            logger.error(f"Error closing Supabase client: {error!r}")
+        if errors: raise errors[0]
     
     def close(self):
-        self.postgrest.close()
-        self.auth.close()
-        self.storage.close()
-        self.functions.close()
+        self._last_auth = None
+        if self._postgrest is not None: self._postgrest.close()
+        if self._auth is not None: self._auth.close()
+        if self._storage is not None: self._storage.close()
+        if self._functions is not None: self._functions.close()
+        transports, self._transport, self._async_transport = (self._transport, self._async_transport), None, None
+        close_transports(*transports)
     
     def __enter__(self):
         return self
@@ -225,14 +352,31 @@ class SupabaseClient:
 
 
 
+# `SupabaseClient` arguments that are not settings fields
+_CLIENT_ONLY_PARAMS = frozenset((
+    "schema", "local_storage", "api", "async_local_storage", "async_api",
+))
+
+
 class SupabaseAPI:
-    settings: Optional[SupabaseSettings] = sb_settings
-    _api: Optional[SupabaseClient] = None
 
     """
     The Global Class for Supabase API.
     """
 
+    # `__dict__` is kept so the cached properties below can store their values
+    __slots__ = ("_api", "settings", "__dict__")
+
+    # cached properties that are bound to the current `_api`
+    _api_attrs = ("api", "auth", "postgrest", "storage", "functions")
+
+    # methods that are re-bound directly to the current `_api`
+    _api_methods = ("from_", "afrom_", "table", "atable", "rpc", "async_rpc", "realtime", "set_auth")
+
+    def __init__(self, settings: Optional[SupabaseSettings] = None):
+        self.settings: SupabaseSettings = settings if settings is not None else sb_settings
+        self._api: Optional[SupabaseClient] = None
+
     def configure(
         self, 
         url: Optional[str] = None,
@@ -276,11 +420,41 @@ class SupabaseAPI:
             timeout=timeout,
             cookie_options=cookie_options,
             replace_default_headers=replace_default_headers,
-            **kwargs
+            **{k: v for k, v in kwargs.items() if k not in _CLIENT_ONLY_PARAMS}
         )
-        if reset: self._api = None
+        if reset: self.reset_api()
         if self._api is None:
-            self.get_api(**kwargs)
+            # the settings fields are read from `self.settings`, only pass what it does not hold
+            self.get_api(**{k: v for k, v in kwargs.items() if k in _CLIENT_ONLY_PARAMS})
+    
+    def reset_api(self):
+        """
+        Closes and drops the current client along with any attributes cached from it.
+        """
+        api, self._api = self._api, None
+        for attr in self._api_attrs + self._api_methods:
+            self.__dict__.pop(attr, None)
+        if api is not None: self._close_api(api)
+    
+    @staticmethod
+    def _close_api(api: SupabaseClient):
+        """
+        Closes a client that is being replaced, without blocking
+        if there is a running event loop.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            task = loop.create_task(api.aclose())
+            _closing_tasks.add(task)
+            task.add_done_callback(_closing_tasks.discard)
+            return
+        try:
+            api.close()
+        except Exception as e:
+            logger.error(f"Error closing Supabase client: {e!r}")
     
     def get_api(self, **kwargs) -> SupabaseClient:
         if self._api is None:
@@ -288,10 +462,13 @@ class SupabaseAPI:
                 settings = self.settings,
                 **kwargs
             )
+            self.__dict__["api"] = self._api
+            for method in self._api_methods:
+                self.__dict__[method] = getattr(self._api, method)
         return self._api
     
 
-    @property
+    @cached_property
     def api(self) -> SupabaseClient:
         """
         Returns the inherited Supabase client.
@@ -300,19 +477,19 @@ class SupabaseAPI:
             self.configure()
         return self._api
 
-    @property
+    @cached_property
     def auth(self) -> SupabaseAuthClient:
         return self.api.auth
     
-    @property
+    @cached_property
     def postgrest(self) -> SupabasePostgrestClient:
         return self.api.postgrest
     
-    @property
+    @cached_property
     def storage(self) -> SupabaseStorageClient:
         return self.api.storage
     
-    @property
+    @cached_property
     def functions(self) -> FunctionsClient:
         return self.api.functions
 
@@ -350,15 +527,6 @@ class SupabaseAPI:
             the new jwt token sent in the authorisation header
         """
         return self.api.set_auth(token, username = username, password = password)
-
-    
-    @property
-    def functions(self) -> FunctionsClient:
-        return self.api.functions
-    
-    @property
-    def storage(self) -> SupabaseStorageClient:
-        return self.api.storage
     
 
     def from_(self, table_name: str) -> SyncRequestBuilder:
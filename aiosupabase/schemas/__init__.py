@@ -1,9 +1,25 @@
-from __future__ import absolute_import
+import importlib
+from typing import Any
 
+_lazy_imports = {
+    "SupabaseAuthClient": "aiosupabase.schemas.auth",
+    "SupabasePostgrestClient": "aiosupabase.schemas.pgrest",
+    "SupabaseRealtimeClient": "aiosupabase.schemas.rt",
+    "SupabaseStorageClient": "aiosupabase.schemas.storage",
+    "FunctionsClient": "aiosupabase.schemas.funcs",
+    "InvokeOptions": "aiosupabase.schemas.funcs",
+}
 
-from aiosupabase.schemas.auth import SupabaseAuthClient
-from aiosupabase.schemas.pgrest import SupabasePostgrestClient
-from aiosupabase.schemas.rt import SupabaseRealtimeClient
-from aiosupabase.schemas.storage import SupabaseStorageClient
-from aiosupabase.schemas.funcs import FunctionsClient
+__all__ = list(_lazy_imports)
 
+
+def __getattr__(name: str) -> Any:
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_lazy_imports[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
@@ -1,5 +1,10 @@
+import time
+import asyncio
+import inspect
+import threading
+import httpx
 import aiohttpx
-from typing import Dict, Optional, Union, Any, Callable, List
+from typing import Dict, Optional, Union, Any, Callable, Iterable, List, Tuple
 
 from gotrue import (
     CookieOptions,
@@ -13,9 +18,9 @@ from gotrue import (
     AsyncSupportedStorage,
 )
 
+from gotrue.exceptions import APIError
 from gotrue.types import (
     AuthChangeEvent,
-    CookieOptions,
     Provider,
     Session,
     Subscription,
@@ -27,7 +32,44 @@ from gotrue.types import (
 
 from aiosupabase.utils.config import SupabaseSettings
 from aiosupabase.utils.config import settings as sb_settings
-from lazyops.types import lazyproperty
+from aiosupabase.utils.helpers import bearer, cached_property, decode_jwt_claims, looks_like_jwt, token_digest
+from concurrent.futures import Future
+from functools import wraps
+from operator import attrgetter
+
+# The attributes resolved in `SupabaseAuthClient.__init__`
+# and the settings they fall back to
+_ATTR_KEYS = (
+    "url", "default_headers", "auto_refresh_token", 
+    "persist_session", "cookie_options", "replace_default_headers",
+)
+_SETTING_KEYS = (
+    "auth_url", "default_headers", "auto_refresh_token", 
+    "persist_session", "cookie_options", "replace_default_headers",
+)
+
+
+# `get_user` results are cached until the token's own `exp`
+_USER_CACHE_MAXSIZE = 4096
+_USER_CACHE_MIN_TTL = 5
+
+
+# parsed `cookie_options` dicts, so the settings default is only parsed once per process
+_COOKIE_OPTIONS_CACHE_MAXSIZE = 64
+_cookie_options_cache: Dict[Tuple, CookieOptions] = {}
+
+
+def _parse_cookie_options(options: Dict[str, Any]) -> CookieOptions:
+    try:
+        key = tuple(sorted(options.items()))
+        parsed = _cookie_options_cache.get(key)
+    except TypeError:
+        # unhashable values are parsed every time
+        return CookieOptions.parse_obj(options)
+    if parsed is None:
+        parsed = CookieOptions.parse_obj(options)
+        if len(_cookie_options_cache) < _COOKIE_OPTIONS_CACHE_MAXSIZE: _cookie_options_cache[key] = parsed
+    return parsed
 
 
 class SupabaseAuthClient:
@@ -37,6 +79,23 @@ class SupabaseAuthClient:
     async and sync
     """
 
+    # cached properties (clients, apis, storages, headers) live in `__dict__`
+    __slots__ = (
+        "settings", "url", "default_headers", "auto_refresh_token", 
+        "persist_session", "cookie_options", "replace_default_headers",
+        "transport", "async_transport", "_user_fn", "_session_fn", "__dict__",
+    )
+
+    # shared across clients, keyed by `token_digest(url, jwt)` -> (user, expires_at)
+    _user_cache: Dict[str, Tuple[User, float]] = {}
+    # `get_user` is called from multiple threads, writes and scans are taken under it
+    _user_cache_lock = threading.Lock()
+
+    # in-flight `get_user` calls, keyed by the same digest
+    _sync_inflight: Dict[str, Future] = {}
+    _sync_inflight_lock = threading.Lock()
+    _async_inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Task] = {}
+
     def __init__(
         self,
         *,
@@ -52,1363 +111,221 @@ class SupabaseAuthClient:
 
         async_local_storage: Optional[AsyncSupportedStorage] = None,
         async_api: Optional[AsyncGoTrueAPI] = None,
-        settings: Optional[SupabaseSettings] = None,
-    ):
-
-        self.settings: SupabaseSettings = settings if settings is not None else sb_settings
-        self.url = url if url is not None else self.settings.auth_url
-        self.default_headers = headers if headers is not None else self.settings.default_headers
-        self.auto_refresh_token = auto_refresh_token if auto_refresh_token is not None else self.settings.auto_refresh_token
-        self.persist_session = persist_session if persist_session is not None else self.settings.persist_session
-        self.cookie_options = cookie_options if cookie_options is not None else self.settings.cookie_options
-        if isinstance(self.cookie_options, dict):
-            self.cookie_options = CookieOptions.parse_obj(self.cookie_options)
-        
-        self.replace_default_headers = replace_default_headers if replace_default_headers is not None else self.settings.replace_default_headers
-
-        # Lazy Initialization
-        self._http_session: aiohttpx.Client = None
-
-        self._sync_local_storage: SyncMemoryStorage = local_storage
-        self._sync_api: SyncGoTrueAPI = api
-        self._sync_client: SyncGoTrueClient = None
-
-        self._async_local_storage: AsyncSupportedStorage  = async_local_storage
-        self._async_api: AsyncGoTrueAPI = async_api
-        self._async_client: AsyncGoTrueClient = None
-
-    @property
-    def http_session(self) -> aiohttpx.Client:
-        if self._http_session is None: self._http_session = self.create_http_session()
-        return self._http_session
-
-    def create_http_session(
-        self,
-        base_url: Optional[str] = None,
-        headers: Optional[Dict[str, str]] = None,
-    ) -> aiohttpx.Client:
-        base_url = base_url if base_url is not None else self.url
-        headers = headers if headers is not None else self.headers
-        return aiohttpx.Client(
-            base_url = base_url,
-            headers = headers,
-        )
-
-
-    @lazyproperty
-    def headers(self):
-        _headers = self.default_headers.copy()
-        if self.settings.key:
-            _headers["apiKey"] = self.settings.key
-            _headers["Authorization"] = f"Bearer {self.settings.key}"
-        return _headers
-
-    @property
-    def local_storage(self):
-        if self._sync_local_storage is None:
-            self._sync_local_storage = SyncMemoryStorage()
-        return self._sync_local_storage
-    
-    @property
-    def async_local_storage(self):
-        if self._async_local_storage is None:
-            self._async_local_storage = AsyncMemoryStorage()
-        return self._async_local_storage
-
-    @property
-    def sync_api(self) -> SyncGoTrueAPI:
-        if self._sync_api is None:
-            self._sync_api = SyncGoTrueAPI(
-                url=self.url,
-                headers = self.headers,
-                cookie_options = self.cookie_options,
-                http_client = self.http_session.sync_client,
-            )
-        return self._sync_api
-    
-    @property
-    def async_api(self) -> AsyncGoTrueAPI:
-        if self._async_api is None:
-            self._async_api = AsyncGoTrueAPI(
-                url=self.url,
-                headers = self.headers,
-                cookie_options = self.cookie_options,
-                http_client = self.http_session.async_client,
-            )
-        return self._async_api
-
-    @property
-    def client(self):
-        if self._sync_client is None:
-            self._sync_client = SyncGoTrueClient(
-                url = self.url,
-                headers = self.headers,
-                auto_refresh_token = self.auto_refresh_token,
-                persist_session = self.persist_session,
-                cookie_options = self.cookie_options,
-                replace_default_headers = self.replace_default_headers,
-                local_storage = self.local_storage,
-                api = self.sync_api,
-            )
-        return self._sync_client
-
-    @property
-    def async_client(self):
-        if self._async_client is None:
-            self._async_client = AsyncGoTrueClient(
-                url = self.url,
-                headers = self.headers,
-                auto_refresh_token = self.auto_refresh_token,
-                persist_session = self.persist_session,
-                cookie_options = self.cookie_options,
-                replace_default_headers = self.replace_default_headers,
-                local_storage = self.async_local_storage,
-                api = self.async_api,
-            )
-        return self._async_client
-
-    def _validate_jwt(
-        self,
-        jwt: Optional[str] = None,
-    ) -> str:
-        """
-        Validates the JWT - if provided
-        """
-        if jwt is not None: return jwt
-        if self.session and self.session.access_token:
-            return self.session.access_token
-        return self.settings.key
-
-    """
-    SyncGoTrueClient | AsyncGoTrueClient 
-    Methods
-    """
-
-    def init_recover(self) -> None:
-        """Recover the current session from local storage."""
-        return self.client.init_recover()
-    
-    async def async_init_recover(self) -> None:
-        """Recover the current session from local storage."""
-        return await self.async_client.init_recover()
-    
-    def sign_up(
-        self,
-        *,
-        email: Optional[str] = None,
-        phone: Optional[str] = None,
-        password: Optional[str] = None,
-        redirect_to: Optional[str] = None,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> Union[Session, User]:
-        """Creates a new user. If email and phone are provided, email will be
-        used and phone will be ignored.
-
-        Parameters
-        ---------
-        email : Optional[str]
-            The user's email address.
-        phone : Optional[str]
-            The user's phone number.
-        password : Optional[str]
-            The user's password.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        data : Optional[Dict[str, Any]]
-            Optional user metadata.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.client.sign_up(
-            email=email,
-            phone=phone,
-            password=password,
-            redirect_to=redirect_to,
-            data=data,
-        )
-
-    async def async_sign_up(
-        self,
-        *,
-        email: Optional[str] = None,
-        phone: Optional[str] = None,
-        password: Optional[str] = None,
-        redirect_to: Optional[str] = None,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> Union[Session, User]:
-        """Creates a new user. If email and phone are provided, email will be
-        used and phone will be ignored.
-
-        Parameters
-        ---------
-        email : Optional[str]
-            The user's email address.
-        phone : Optional[str]
-            The user's phone number.
-        password : Optional[str]
-            The user's password.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        data : Optional[Dict[str, Any]]
-            Optional user metadata.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_client.sign_up(
-            email=email,
-            phone=phone,
-            password=password,
-            redirect_to=redirect_to,
-            data=data,
-        )
-
-    def sign_in(
-        self,
-        *,
-        email: Optional[str] = None,
-        phone: Optional[str] = None,
-        password: Optional[str] = None,
-        refresh_token: Optional[str] = None,
-        provider: Optional[Provider] = None,
-        redirect_to: Optional[str] = None,
-        scopes: Optional[str] = None,
-        create_user: bool = False,
-    ) -> Optional[Union[Session, str]]:
-        """Log in an existing user, or login via a third-party provider.
-        If email and phone are provided, email will be used and phone will be ignored.
-
-        Parameters
-        ---------
-        email : Optional[str]
-            The user's email address.
-        phone : Optional[str]
-            The user's phone number.
-        password : Optional[str]
-            The user's password.
-        refresh_token : Optional[str]
-            A valid refresh token that was returned on login.
-        provider : Optional[Provider]
-            One of the providers supported by GoTrue.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        scopes : Optional[str]
-            A space-separated list of scopes granted to the OAuth application.
-
-        Returns
-        -------
-        response : Optional[Union[Session, str]]
-            If only email are provided between the email and password,
-            None is returned and send magic link to email
-
-            If email and password are provided, a logged-in session is returned.
-
-            If only phone are provided between the phone and password,
-            None is returned and send message to phone
-
-            If phone and password are provided, a logged-in session is returned.
-
-            If refresh_token is provided, a logged-in session is returned.
-
-            If provider is provided, an redirect URL is returned.
-
-            Otherwise, error is raised.
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.client.sign_in(
-            email=email,
-            phone=phone,
-            password=password,
-            refresh_token=refresh_token,
-            provider=provider,
-            redirect_to=redirect_to,
-            scopes=scopes,
-            create_user=create_user,
-        )
-
-    async def async_sign_in(
-        self,
-        *,
-        email: Optional[str] = None,
-        phone: Optional[str] = None,
-        password: Optional[str] = None,
-        refresh_token: Optional[str] = None,
-        provider: Optional[Provider] = None,
-        redirect_to: Optional[str] = None,
-        scopes: Optional[str] = None,
-        create_user: bool = False,
-    ) -> Optional[Union[Session, str]]:
-        """Log in an existing user, or login via a third-party provider.
-        If email and phone are provided, email will be used and phone will be ignored.
-
-        Parameters
-        ---------
-        email : Optional[str]
-            The user's email address.
-        phone : Optional[str]
-            The user's phone number.
-        password : Optional[str]
-            The user's password.
-        refresh_token : Optional[str]
-            A valid refresh token that was returned on login.
-        provider : Optional[Provider]
-            One of the providers supported by GoTrue.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        scopes : Optional[str]
-            A space-separated list of scopes granted to the OAuth application.
-
-        Returns
-        -------
-        response : Optional[Union[Session, str]]
-            If only email are provided between the email and password,
-            None is returned and send magic link to email
-
-            If email and password are provided, a logged-in session is returned.
-
-            If only phone are provided between the phone and password,
-            None is returned and send message to phone
-
-            If phone and password are provided, a logged-in session is returned.
-
-            If refresh_token is provided, a logged-in session is returned.
-
-            If provider is provided, an redirect URL is returned.
-
-            Otherwise, error is raised.
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_client.sign_in(
-            email=email,
-            phone=phone,
-            password=password,
-            refresh_token=refresh_token,
-            provider=provider,
-            redirect_to=redirect_to,
-            scopes=scopes,
-            create_user=create_user,
-        )
-
-    def verify_otp(
-        self,
-        *,
-        phone: str,
-        token: str,
-        redirect_to: Optional[str] = None,
-    ) -> Union[Session, User]:
-        """Log in a user given a User supplied OTP received via mobile.
-
-        Parameters
-        ----------
-        phone : str
-            The user's phone number.
-        token : str
-            The user's OTP.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.client.verify_otp(
-            phone=phone,
-            token=token,
-            redirect_to=redirect_to,
-        )
-
-    async def async_verify_otp(
-        self,
-        *,
-        phone: str,
-        token: str,
-        redirect_to: Optional[str] = None,
-    ) -> Union[Session, User]:
-        """Log in a user given a User supplied OTP received via mobile.
-
-        Parameters
-        ----------
-        phone : str
-            The user's phone number.
-        token : str
-            The user's OTP.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_client.verify_otp(
-            phone=phone,
-            token=token,
-            redirect_to=redirect_to,
-        )
-
-    @property
-    def user(self) -> Optional[User]:
-        """Returns the user data, if there is a logged in user."""
-        if self._async_client: return self._async_client.user()
-        return self._sync_client.user() if self._sync_client else None
-
-    @property
-    def session(self) -> Optional[Session]:
-        """Returns the session data, if there is an active session."""
-        if self._async_client: return self._async_client.session()
-        return self._sync_client.session() if self._sync_client else None
-
-    def refresh_session(self) -> Session:
-        """Force refreshes the session.
-
-        Force refreshes the session including the user data incase it was
-        updated in a different session.
-        """
-        return self.client.refresh_session()
-    
-    async def async_refresh_session(self) -> Session:
-        """Force refreshes the session.
-
-        Force refreshes the session including the user data incase it was
-        updated in a different session.
-        """
-        return await self.async_client.refresh_session()
-    
-    def update(self, *, attributes: Union[UserAttributesDict, UserAttributes]) -> User:
-        """Updates user data, if there is a logged in user.
-
-        Parameters
-        ----------
-        attributes : UserAttributesDict | UserAttributes
-            Attributes to update, could be: email, password, email_change_token, data
-
-        Returns
-        -------
-        response : User
-            The updated user data.
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.client.update(
-            attributes=attributes,
-        )
-    
-    async def async_update(self, *, attributes: Union[UserAttributesDict, UserAttributes]) -> User:
-        """Updates user data, if there is a logged in user.
-
-        Parameters
-        ----------
-        attributes : UserAttributesDict | UserAttributes
-            Attributes to update, could be: email, password, email_change_token, data
-
-        Returns
-        -------
-        response : User
-            The updated user data.
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_client.update(
-            attributes=attributes,
-        )
-    
-    def set_session(self, *, refresh_token: str) -> Session:
-        """Sets the session data from refresh_token and returns current Session
-
-        Parameters
-        ----------
-        refresh_token : str
-            A JWT token
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.client.set_session(
-            refresh_token=refresh_token,
-        )
-
-
-    async def async_set_session(self, *, refresh_token: str) -> Session:
-        """Sets the session data from refresh_token and returns current Session
-
-        Parameters
-        ----------
-        refresh_token : str
-            A JWT token
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_client.set_session(
-            refresh_token=refresh_token,
-        )
-
-    def set_auth(self, *, access_token: str) -> Session:
-        """Overrides the JWT on the current client. The JWT will then be sent in
-        all subsequent network requests.
-
-        Parameters
-        ----------
-        access_token : str
-            A JWT token
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.client.set_auth(
-            access_token=access_token,
-        )
-    
-    async def async_set_auth(self, *, access_token: str) -> Session:
-        """Overrides the JWT on the current client. The JWT will then be sent in
-        all subsequent network requests.
-
-        Parameters
-        ----------
-        access_token : str
-            A JWT token
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_client.set_auth(
-            access_token=access_token,
-        )
-    
-    def get_session_from_url(
-        self,
-        *,
-        url: str,
-        store_session: bool = False,
-    ) -> Session:
-        """Gets the session data from a URL string.
-
-        Parameters
-        ----------
-        url : str
-            The URL string.
-        store_session : bool
-            Optionally store the session in the browser
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.client.get_session_from_url(
-            url=url,
-            store_session=store_session,
-        )
-    
-    async def async_get_session_from_url(
-        self,
-        *,
-        url: str,
-        store_session: bool = False,
-    ) -> Session:
-        """Gets the session data from a URL string.
-
-        Parameters
-        ----------
-        url : str
-            The URL string.
-        store_session : bool
-            Optionally store the session in the browser
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_client.get_session_from_url(
-            url=url,
-            store_session=store_session,
-        )
-    
-    
-    def sign_out(self) -> None:
-        """Log the user out."""
-        return self.client.sign_out()
-    
-    async def async_sign_out(self) -> None:
-        """Log the user out."""
-        return await self.async_client.sign_out()
-    
-    def on_auth_state_change(
-        self,
-        *,
-        callback: Callable[[AuthChangeEvent, Optional[Session]], None],
-    ) -> Subscription:
-        """Receive a notification every time an auth event happens.
-
-        Parameters
-        ----------
-        callback : Callable[[AuthChangeEvent, Optional[Session]], None]
-            The callback to call when an auth event happens.
-
-        Returns
-        -------
-        subscription : Subscription
-            A subscription object which can be used to unsubscribe itself.
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.client.on_auth_state_change(
-            callback=callback,
-        )
-    
-    async def async_on_auth_state_change(
-        self,
-        *,
-        callback: Callable[[AuthChangeEvent, Optional[Session]], None],
-     ) -> Subscription:
-        """Receive a notification every time an auth event happens.
-
-        Parameters
-        ----------
-        callback : Callable[[AuthChangeEvent, Optional[Session]], None]
-            The callback to call when an auth event happens.
-
-        Returns
-        -------
-        subscription : Subscription
-            A subscription object which can be used to unsubscribe itself.
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_client.on_auth_state_change(
-            callback=callback,
-        )
-    
-    """
-    AsyncGoTrueAPI / SyncGoTrueAPI
-    methods
-    """
-    def create_user(self, *, attributes: UserAttributes) -> User:
-        """Creates a new user.
-
-        This function should only be called on a server.
-        Never expose your `service_role` key in the browser.
-
-        Parameters
-        ----------
-        attributes: UserAttributes
-            The data you want to create the user with.
-
-        Returns
-        -------
-        response : User
-            The created user
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.create_user(
-            attributes=attributes,
-        )
-
-    async def async_create_user(self, *, attributes: UserAttributes) -> User:
-        """Creates a new user.
-
-        This function should only be called on a server.
-        Never expose your `service_role` key in the browser.
-
-        Parameters
-        ----------
-        attributes: UserAttributes
-            The data you want to create the user with.
-
-        Returns
-        -------
-        response : User
-            The created user
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.create_user(
-            attributes=attributes,
-        )
-
-    def list_users(self) -> List[User]:
-        """Get a list of users.
-
-        This function should only be called on a server.
-        Never expose your `service_role` key in the browser.
-
-        Returns
-        -------
-        response : List[User]
-            A list of users
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.list_users()
-
-    async def async_list_users(self) -> List[User]:
-        """Get a list of users.
-
-        This function should only be called on a server.
-        Never expose your `service_role` key in the browser.
-
-        Returns
-        -------
-        response : List[User]
-            A list of users
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.list_users()
-    
-    def sign_up_with_email(
-        self,
-        *,
-        email: str,
-        password: str,
-        redirect_to: Optional[str] = None,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> Union[Session, User]:
-        """Creates a new user using their email address.
-
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        password : str
-            The password of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        data : Optional[Dict[str, Any]]
-            Optional user metadata.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.sign_up_with_email(
-            email=email,
-            password=password,
-            redirect_to=redirect_to,
-            data=data,
-        )
-
-    
-    async def async_sign_up_with_email(
-        self,
-        *,
-        email: str,
-        password: str,
-        redirect_to: Optional[str] = None,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> Union[Session, User]:
-        """Creates a new user using their email address.
-
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        password : str
-            The password of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        data : Optional[Dict[str, Any]]
-            Optional user metadata.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.sign_up_with_email(
-            email=email,
-            password=password,
-            redirect_to=redirect_to,
-            data=data,
-        )
-
-    def sign_in_with_email(
-        self,
-        *,
-        email: str,
-        password: str,
-        redirect_to: Optional[str] = None,
-    ) -> Session:
-        """Logs in an existing user using their email address.
-
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        password : str
-            The password of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.sign_in_with_email(
-            email=email,
-            password=password,
-            redirect_to=redirect_to,
-        )
-    
-    async def async_sign_in_with_email(
-        self,
-        *,
-        email: str,
-        password: str,
-        redirect_to: Optional[str] = None,
-    ) -> Session:
-        """Logs in an existing user using their email address.
-
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        password : str
-            The password of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.sign_in_with_email(
-            email=email,
-            password=password,
-            redirect_to=redirect_to,
-        )
-
-
-    def sign_up_with_phone(
-        self,
-        *,
-        phone: str,
-        password: str,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> Union[Session, User]:
-        """Signs up a new user using their phone number and a password.
-
-        Parameters
-        ----------
-        phone : str
-            The phone number of the user.
-        password : str
-            The password of the user.
-        data : Optional[Dict[str, Any]]
-            Optional user metadata.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.sign_up_with_phone(
-            phone=phone,
-            password=password,
-            data=data,
-        )
-    
-    async def async_sign_up_with_phone(
-        self,
-        *,
-        phone: str,
-        password: str,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> Union[Session, User]:
-        """Signs up a new user using their phone number and a password.
-
-        Parameters
-        ----------
-        phone : str
-            The phone number of the user.
-        password : str
-            The password of the user.
-        data : Optional[Dict[str, Any]]
-            Optional user metadata.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.sign_up_with_phone(
-            phone=phone,
-            password=password,
-            data=data,
-        )
-
-    def sign_in_with_phone(
-        self,
-        *,
-        phone: str,
-        password: str,
-    ) -> Session:
-        """Logs in an existing user using their phone number and password.
-
-        Parameters
-        ----------
-        phone : str
-            The phone number of the user.
-        password : str
-            The password of the user.
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.sign_in_with_phone(
-            phone=phone,
-            password=password,
-        )
-    
-    async def async_sign_in_with_phone(
-        self,
-        *,
-        phone: str,
-        password: str,
-    ) -> Session:
-        """Logs in an existing user using their phone number and password.
-
-        Parameters
-        ----------
-        phone : str
-            The phone number of the user.
-        password : str
-            The password of the user.
-
-        Returns
-        -------
-        response : Session
-            A logged-in session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.sign_in_with_phone(
-            phone=phone,
-            password=password,
-        )
-    
-    def send_magic_link_email(
-        self,
-        *,
-        email: str,
-        create_user: bool,
-        redirect_to: Optional[str] = None,
-    ) -> None:
-        """Sends a magic login link to an email address.
-
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.send_magic_link_email(
-            email=email,
-            create_user=create_user,
-            redirect_to=redirect_to,
-        )
-    
-    async def async_send_magic_link_email(
-        self,
-        *,
-        email: str,
-        create_user: bool,
-        redirect_to: Optional[str] = None,
-    ) -> None:
-        """Sends a magic login link to an email address.
-
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.send_magic_link_email(
-            email=email,
-            create_user=create_user,
-            redirect_to=redirect_to,
-        )
-
-    def send_mobile_otp(self, *, phone: str, create_user: bool) -> None:
-        """Sends a mobile OTP via SMS. Will register the account if it doesn't already exist
-
-        Parameters
-        ----------
-        phone : str
-            The user's phone number WITH international prefix
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.send_mobile_otp(phone=phone, create_user=create_user)
+        settings: Optional[SupabaseSettings] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
 
-    
-    async def async_send_mobile_otp(self, *, phone: str, create_user: bool) -> None:
-        """Sends a mobile OTP via SMS. Will register the account if it doesn't already exist
+        self.settings: SupabaseSettings = settings if settings is not None else sb_settings
+        defaults = self.settings.auth_defaults
+        values = (url, headers, auto_refresh_token, persist_session, cookie_options, replace_default_headers)
+        for attr, setting, value in zip(_ATTR_KEYS, _SETTING_KEYS, values):
+            setattr(self, attr, value if value is not None else defaults[setting])
+        # the common case (already parsed) is a single type compare, dict subclasses are still parsed
+        if type(self.cookie_options) is not CookieOptions and isinstance(self.cookie_options, dict):
+            self.cookie_options = _parse_cookie_options(self.cookie_options)
+
+        # Shared connection pools, if provided
+        self.transport = transport
+        self.async_transport = async_transport
+
+        # Lazy Initialization, overrides are seeded into the cached properties
+        if local_storage is not None: self.__dict__["local_storage"] = local_storage
+        if api is not None: self.__dict__["sync_api"] = api
+        if async_local_storage is not None: self.__dict__["async_local_storage"] = async_local_storage
+        if async_api is not None: self.__dict__["async_api"] = async_api
+
+        # Bound `user` / `session` of the active client, the async client takes precedence
+        self._user_fn: Optional[Callable[[], Optional[User]]] = None
+        self._session_fn: Optional[Callable[[], Optional[Session]]] = None
+
+    @cached_property
+    def http_session(self) -> aiohttpx.Client:
+        return self.create_http_session()
 
-        Parameters
-        ----------
-        phone : str
-            The user's phone number WITH international prefix
+    @cached_property
+    def sync_http_client(self) -> httpx.Client:
+        return self.http_session.sync_client
 
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.send_mobile_otp(phone=phone, create_user=create_user)
+    @cached_property
+    def async_http_client(self) -> httpx.AsyncClient:
+        return self.http_session.async_client
 
-    def verify_mobile_otp(
+    def create_http_session(
         self,
-        *,
-        phone: str,
-        token: str,
-        redirect_to: Optional[str] = None,
-    ) -> Union[Session, User]:
-        """Send User supplied Mobile OTP to be verified
+        base_url: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> aiohttpx.Client:
+        base_url = base_url if base_url is not None else self.url
+        headers = headers if headers is not None else self.headers
+        return aiohttpx.Client(
+            base_url = base_url,
+            headers = headers,
+            transport = self.transport,
+            async_transport = self.async_transport,
+        )
 
-        Parameters
-        ----------
-        phone : str
-            The user's phone number WITH international prefix
-        token : str
-            Token that user was sent to their mobile phone
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
 
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
+    @cached_property
+    def headers(self):
+        key = self.settings.key
+        if not key: return dict(self.default_headers)
+        return {**self.default_headers, "apiKey": key, "Authorization": bearer(key)}
 
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.verify_mobile_otp(
-            phone=phone,
-            token=token,
-            redirect_to=redirect_to,
+    @cached_property
+    def local_storage(self) -> SyncSupportedStorage:
+        return SyncMemoryStorage()
+    
+    @cached_property
+    def async_local_storage(self) -> AsyncSupportedStorage:
+        return AsyncMemoryStorage()
+
+    @cached_property
+    def sync_api(self) -> SyncGoTrueAPI:
+        return SyncGoTrueAPI(
+            url=self.url,
+            headers = self.headers,
+            cookie_options = self.cookie_options,
+            http_client = self.sync_http_client,
         )
     
-    async def async_verify_mobile_otp(
-        self,
-        *,
-        phone: str,
-        token: str,
-        redirect_to: Optional[str] = None,
-    ) -> Union[Session, User]:
-        """Send User supplied Mobile OTP to be verified
+    @cached_property
+    def async_api(self) -> AsyncGoTrueAPI:
+        return AsyncGoTrueAPI(
+            url=self.url,
+            headers = self.headers,
+            cookie_options = self.cookie_options,
+            http_client = self.async_http_client,
+        )
+
+    @cached_property
+    def client(self) -> SyncGoTrueClient:
+        client = SyncGoTrueClient(
+            url = self.url,
+            headers = self.headers,
+            auto_refresh_token = self.auto_refresh_token,
+            persist_session = self.persist_session,
+            cookie_options = self.cookie_options,
+            replace_default_headers = self.replace_default_headers,
+            local_storage = self.local_storage,
+            api = self.sync_api,
+        )
+        if self._user_fn is None:
+            self._user_fn = client.user
+            self._session_fn = client.session
+        # later calls resolve straight to the client's bound methods
+        for name in _CLIENT_METHODS:
+            self.__dict__[name] = getattr(client, name)
+        return client
+
+    @cached_property
+    def async_client(self) -> AsyncGoTrueClient:
+        client = AsyncGoTrueClient(
+            url = self.url,
+            headers = self.headers,
+            auto_refresh_token = self.auto_refresh_token,
+            persist_session = self.persist_session,
+            cookie_options = self.cookie_options,
+            replace_default_headers = self.replace_default_headers,
+            local_storage = self.async_local_storage,
+            api = self.async_api,
+        )
+        self._user_fn = client.user
+        self._session_fn = client.session
+        for name in _ASYNC_BOUND_METHODS:
+            self.__dict__[f"async_{name}"] = getattr(client, name)
+        return client
 
-        Parameters
-        ----------
-        phone : str
-            The user's phone number WITH international prefix
-        token : str
-            Token that user was sent to their mobile phone
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
+    def _validate_jwt(
+        self,
+        jwt: Optional[str] = None,
+    ) -> str:
+        """
+        Validates the JWT - if provided
 
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
+        Structurally invalid tokens are rejected locally
+        with an `APIError` instead of a round trip
+        """
+        if jwt is None:
+            session = self.session
+            if session and session.access_token: return session.access_token
+            return self.settings.key
+        if not looks_like_jwt(jwt):
+            raise APIError(msg = "Invalid JWT: malformed token", code = 401)
+        return jwt
 
-        Raises
-        ------
-        error : APIError
-            If an error occurs
+    def _get_cached_user(self, jwt: str) -> Tuple[str, Optional[float], Optional[User]]:
         """
-        return await self.async_api.verify_mobile_otp(
-            phone=phone,
-            token=token,
-            redirect_to=redirect_to,
-        )
-    
-    def invite_user_by_email(
-        self,
-        *,
-        email: str,
-        redirect_to: Optional[str] = None,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> User:
-        """Sends an invite link to an email address.
+        Returns the cache key and expiry for the JWT, along with the cached user if any.
 
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        data : Optional[Dict[str, Any]]
-            Optional user metadata.
+        The expiry is None when the token should not be cached (no `exp` or about to expire)
+        """
+        key = token_digest(self.url, jwt)
+        claims = decode_jwt_claims(jwt)
+        expires_at = claims.get("exp") if claims else None
+        if not isinstance(expires_at, (int, float)) or expires_at - time.time() < _USER_CACHE_MIN_TTL:
+            return key, None, None
+        cached = self._user_cache.get(key)
+        if cached is not None and cached[1] > time.time(): return key, expires_at, cached[0]
+        return key, expires_at, None
 
-        Returns
-        -------
-        response : User
-            A user
+    def _set_cached_user(self, key: str, expires_at: Optional[float], user: User) -> User:
+        """
+        Caches the user for the JWT until `expires_at`
+        """
+        if expires_at is None: return user
+        cache = self._user_cache
+        with self._user_cache_lock:
+            if len(cache) >= _USER_CACHE_MAXSIZE:
+                now = time.time()
+                for k in [k for k, (_, exp) in cache.items() if exp <= now]: del cache[k]
+                # evict the oldest entry if everything is still fresh
+                if len(cache) >= _USER_CACHE_MAXSIZE: cache.pop(next(iter(cache)), None)
+            cache[key] = (user, expires_at)
+        return user
 
-        Raises
-        ------
-        error : APIError
-            If an error occurs
+    def _evict_cached_user(self, jwt: Optional[str] = None, uid: Optional[str] = None) -> None:
         """
-        return self.sync_api.invite_user_by_email(
-            email=email,
-            redirect_to=redirect_to,
-            data=data,
-        )
-    
-    async def async_invite_user_by_email(
-        self,
-        *,
-        email: str,
-        redirect_to: Optional[str] = None,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> User:
-        """Sends an invite link to an email address.
+        Removes a cached user by token or by user id
+        """
+        with self._user_cache_lock:
+            if jwt is not None: self._user_cache.pop(token_digest(self.url, jwt), None)
+            if uid is not None:
+                for k in [k for k, (user, _) in self._user_cache.items() if user.id == uid]: 
+                    self._user_cache.pop(k, None)
 
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        data : Optional[Dict[str, Any]]
-            Optional user metadata.
+    """
+    SyncGoTrueClient | AsyncGoTrueClient 
+    Methods
 
-        Returns
-        -------
-        response : User
-            A user
+    The remaining client methods are generated below the class
+    """
 
-        Raises
-        ------
-        error : APIError
-            If an error occurs
+    @property
+    def user(self) -> Optional[User]:
+        """Returns the user data, if there is a logged in user.
+
+        Does not create a client, returns None until one is in use.
         """
-        return await self.async_api.invite_user_by_email(
-            email=email,
-            redirect_to=redirect_to,
-            data=data,
-        )
-    
-    def reset_password_for_email(
-        self,
-        *,
-        email: str,
-        redirect_to: Optional[str] = None,
-    ) -> None:
-        """Sends a reset request to an email address.
+        fn = self._user_fn
+        return fn() if fn is not None else None
 
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
+    @property
+    def session(self) -> Optional[Session]:
+        """Returns the session data, if there is an active session.
 
-        Raises
-        ------
-        error : APIError
-            If an error occurs
+        Does not create a client, returns None until one is in use.
         """
-        return self.sync_api.reset_password_for_email(
-            email=email,
-            redirect_to=redirect_to,
-        )
-    
-    async def async_reset_password_for_email(
-        self,
-        *,
-        email: str,
-        redirect_to: Optional[str] = None,
-    ) -> None:
-        """Sends a reset request to an email address.
+        fn = self._session_fn
+        return fn() if fn is not None else None
 
-        Parameters
-        ----------
-        email : str
-            The email address of the user.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
+    """
+    AsyncGoTrueAPI / SyncGoTrueAPI
+    methods
+
+    The plain passthroughs are generated below the class
+    """
 
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.reset_password_for_email(
-            email=email,
-            redirect_to=redirect_to,
-        )
-    
     def sign_out(self, *, jwt: Optional[str] = None) -> None:
         """Removes a logged-in session.
 
@@ -1417,7 +334,9 @@ class SupabaseAuthClient:
         jwt : str
             A valid, logged-in JWT.
         """
-        return self.sync_api.sign_out(jwt=self._validate_jwt(jwt))
+        jwt = self._validate_jwt(jwt)
+        self._evict_cached_user(jwt = jwt)
+        return self.sync_api.sign_out(jwt=jwt)
 
     
     async def async_sign_out(self, *, jwt: Optional[str] = None) -> None:
@@ -1428,77 +347,11 @@ class SupabaseAuthClient:
         jwt : str
             A valid, logged-in JWT.
         """
-        return await self.async_api.sign_out(jwt=self._validate_jwt(jwt))
-    
-
-    def get_url_for_provider(
-        self,
-        *,
-        provider: Provider,
-        redirect_to: Optional[str] = None,
-        scopes: Optional[str] = None,
-    ) -> str:
-        """Generates the relevant login URL for a third-party provider.
-
-        Parameters
-        ----------
-        provider : Provider
-            One of the providers supported by GoTrue.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        scopes : Optional[str]
-            A space-separated list of scopes granted to the OAuth application.
-
-        Returns
-        -------
-        url : str
-            The URL to redirect the user to.
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.get_url_for_provider(
-            provider=provider,
-            redirect_to=redirect_to,
-            scopes=scopes,
-        )
+        jwt = self._validate_jwt(jwt)
+        self._evict_cached_user(jwt = jwt)
+        return await self.async_api.sign_out(jwt=jwt)
     
-    async def async_get_url_for_provider(
-        self,
-        *,
-        provider: Provider,
-        redirect_to: Optional[str] = None,
-        scopes: Optional[str] = None,
-    ) -> str:
-        """Generates the relevant login URL for a third-party provider.
-
-        Parameters
-        ----------
-        provider : Provider
-            One of the providers supported by GoTrue.
-        redirect_to : Optional[str]
-            A URL or mobile address to send the user to after they are confirmed.
-        scopes : Optional[str]
-            A space-separated list of scopes granted to the OAuth application.
-
-        Returns
-        -------
-        url : str
-            The URL to redirect the user to.
 
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.get_url_for_provider(
-            provider=provider,
-            redirect_to=redirect_to,
-            scopes=scopes,
-        )
-    
     def get_user(self, *, jwt: Optional[str] = None) -> User:
         """Gets the user details.
 
@@ -1517,7 +370,26 @@ class SupabaseAuthClient:
         error : APIError
             If an error occurs
         """
-        return self.sync_api.get_user(jwt=self._validate_jwt(jwt))
+        jwt = self._validate_jwt(jwt)
+        key, expires_at, user = self._get_cached_user(jwt)
+        if user is not None: return user
+
+        # concurrent calls for the same token share a single request
+        with self._sync_inflight_lock:
+            flight = self._sync_inflight.get(key)
+            leader = flight is None
+            if leader: flight = self._sync_inflight[key] = Future()
+        if not leader: return flight.result()
+        try:
+            user = self._set_cached_user(key, expires_at, self.sync_api.get_user(jwt=jwt))
+            flight.set_result(user)
+            return user
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._sync_inflight_lock:
+                self._sync_inflight.pop(key, None)
     
     async def async_get_user(self, *, jwt: Optional[str] = None) -> User:
         """Gets the user details.
@@ -1537,7 +409,28 @@ class SupabaseAuthClient:
         error : APIError
             If an error occurs
         """
-        return await self.async_api.get_user(jwt=self._validate_jwt(jwt))
+        jwt = self._validate_jwt(jwt)
+        key, expires_at, user = self._get_cached_user(jwt)
+        if user is not None: return user
+
+        # concurrent calls for the same token share a single request, run as its own task.
+        # every caller, including the one that started it, awaits it shielded,
+        # so cancelling one caller leaves the request running for the rest
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        task = self._async_inflight.get(flight_key)
+        if task is None:
+            task = self._async_inflight[flight_key] = loop.create_task(self._async_fetch_user(jwt, key, expires_at))
+            task.add_done_callback(lambda t: self._async_flight_done(flight_key, t))
+        return await asyncio.shield(task)
+
+    async def _async_fetch_user(self, jwt: str, key: str, expires_at: Optional[float]) -> User:
+        return self._set_cached_user(key, expires_at, await self.async_api.get_user(jwt=jwt))
+
+    def _async_flight_done(self, flight_key: Tuple[asyncio.AbstractEventLoop, str], task: asyncio.Task) -> None:
+        if self._async_inflight.get(flight_key) is task: del self._async_inflight[flight_key]
+        # mark the error as retrieved in case every caller was cancelled
+        if not task.cancelled(): task.exception()
     
     def update_user(
         self,
@@ -1567,7 +460,10 @@ class SupabaseAuthClient:
         """
         if isinstance(attributes, dict):
             attributes = UserAttributes(**attributes)
-        return self.sync_api.update_user(jwt=self._validate_jwt(jwt), attributes=attributes)
+        jwt = self._validate_jwt(jwt)
+        user = self.sync_api.update_user(jwt=jwt, attributes=attributes)
+        key, expires_at, _ = self._get_cached_user(jwt)
+        return self._set_cached_user(key, expires_at, user)
     
     async def async_update_user(
         self,
@@ -1597,7 +493,10 @@ class SupabaseAuthClient:
         """
         if isinstance(attributes, dict):
             attributes = UserAttributes(**attributes)
-        return await self.async_api.update_user(jwt=self._validate_jwt(jwt), attributes=attributes)
+        jwt = self._validate_jwt(jwt)
+        user = await self.async_api.update_user(jwt=jwt, attributes=attributes)
+        key, expires_at, _ = self._get_cached_user(jwt)
+        return self._set_cached_user(key, expires_at, user)
 
     def delete_user(self, *, uid: str, jwt: Optional[str] = None) -> None:
         """Delete a user. Requires a `service_role` key.
@@ -1622,6 +521,7 @@ class SupabaseAuthClient:
         error : APIError
             If an error occurs
         """
+        self._evict_cached_user(uid = uid)
         return self.sync_api.delete_user(
             uid=uid,
             jwt=self._validate_jwt(jwt),
@@ -1651,151 +551,30 @@ class SupabaseAuthClient:
         error : APIError
             If an error occurs
         """
+        self._evict_cached_user(uid = uid)
         return await self.async_api.delete_user(
             uid=uid,
             jwt=self._validate_jwt(jwt),
         )
 
-    def refresh_access_token(self, *, refresh_token: str) -> Session:
-        """Generates a new JWT.
-
-        Parameters
-        ----------
-        refresh_token : str
-            A valid refresh token that was returned on login.
-
-        Returns
-        -------
-        response : Session
-            A session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.refresh_access_token(
-            refresh_token=refresh_token,
-        )
-
-    async def async_refresh_access_token(self, *, refresh_token: str) -> Session:
-        """Generates a new JWT.
-
-        Parameters
-        ----------
-        refresh_token : str
-            A valid refresh token that was returned on login.
-
-        Returns
-        -------
-        response : Session
-            A session
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.refresh_access_token(
-            refresh_token=refresh_token,
-        )
-
-    def generate_link(
-        self,
-        *,
-        type: LinkType,
-        email: str,
-        password: Optional[str] = None,
-        redirect_to: Optional[str] = None,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> Union[Session, User]:
-        """
-        Generates links to be sent via email or other.
-
-        Parameters
-        ----------
-        type : LinkType
-            The link type ("signup" or "magiclink" or "recovery" or "invite").
-        email : str
-            The user's email.
-        password : Optional[str]
-            User password. For signup only.
-        redirect_to : Optional[str]
-            The link type ("signup" or "magiclink" or "recovery" or "invite").
-        data : Optional[Dict[str, Any]]
-            Optional user metadata. For signup only.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return self.sync_api.generate_link(
-            type=type,
-            email=email,
-            password=password,
-            redirect_to=redirect_to,
-            data=data,
-        )
-
-    async def async_generate_link(
-        self,
-        *,
-        type: LinkType,
-        email: str,
-        password: Optional[str] = None,
-        redirect_to: Optional[str] = None,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> Union[Session, User]:
-        """
-        Generates links to be sent via email or other.
-
-        Parameters
-        ----------
-        type : LinkType
-            The link type ("signup" or "magiclink" or "recovery" or "invite").
-        email : str
-            The user's email.
-        password : Optional[str]
-            User password. For signup only.
-        redirect_to : Optional[str]
-            The link type ("signup" or "magiclink" or "recovery" or "invite").
-        data : Optional[Dict[str, Any]]
-            Optional user metadata. For signup only.
-
-        Returns
-        -------
-        response : Union[Session, User]
-            A logged-in session if the server has "autoconfirm" ON
-            A user if the server has "autoconfirm" OFF
-
-        Raises
-        ------
-        error : APIError
-            If an error occurs
-        """
-        return await self.async_api.generate_link(
-            type=type,
-            email=email,
-            password=password,
-            redirect_to=redirect_to,
-            data=data,
-        )
-
-
     def unsubscribe(self, *, id: str) -> None:
         """Unsubscribe from a subscription."""
         return self.client._unsubscribe(id=id)
     
     async def async_unsubscribe(self, *, id: str) -> None:
         """Unsubscribe from a subscription."""
-        return await self.async_client._unsubscribe(id=id)
+        # gotrue's `_unsubscribe` is synchronous, it only drops the local emitter
+        return self.async_client._unsubscribe(id=id)
+
+    def unsubscribe_many(self, ids: Iterable[str]) -> None:
+        """Unsubscribe from several subscriptions at once."""
+        unsubscribe = self.client._unsubscribe
+        for id in ids: unsubscribe(id=id)
+
+    async def async_unsubscribe_many(self, ids: Iterable[str]) -> None:
+        """Unsubscribe from several subscriptions at once."""
+        unsubscribe = self.async_client._unsubscribe
+        for id in ids: unsubscribe(id=id)
     
 
     def __enter__(self):
@@ -1805,7 +584,13 @@ class SupabaseAuthClient:
         self.close()
 
     def close(self) -> None:
-        self.client.close()
+        api = self.__dict__.get("sync_api")
+        if api is None: return
+        # a pool passed in belongs to the caller, while an api passed in is closed with this client
+        if self.transport is not None and api.http_client is self.__dict__.get("sync_http_client"): return
+        # the clients only wrap the api, which is closed directly since
+        # gotrue's sync `close` calls `aclose` on the httpx client
+        api.http_client.close()
     
     async def __aenter__(self):
         return self
@@ -1814,4 +599,180 @@ class SupabaseAuthClient:
         await self.aclose()
     
     async def aclose(self):
-        await self.async_client.close()
\ No newline at end of file
+        api = self.__dict__.get("async_api")
+        if api is None: return
+        if self.async_transport is not None and api.http_client is self.__dict__.get("async_http_client"): return
+        await api.close()
+
+"""
+SyncGoTrueClient | AsyncGoTrueClient
+Generated Methods
+"""
+
+# These forward as-is to `client.<name>` and `async_client.<name>`
+_CLIENT_METHODS = (
+    "init_recover",
+    "sign_up",
+    "sign_in",
+    "verify_otp",
+    "refresh_session",
+    "update",
+    "set_session",
+    "set_auth",
+    "get_session_from_url",
+    "on_auth_state_change",
+)
+
+
+def _keyword_names(func: Callable[..., Any]) -> frozenset:
+    """
+    The keyword arguments accepted by `func`, resolved once per method
+    """
+    return frozenset(
+        param.name for param in inspect.signature(func).parameters.values()
+        if param.kind in (param.KEYWORD_ONLY, param.POSITIONAL_OR_KEYWORD)
+    )
+
+
+def _check_kwargs(name: str, accepted: frozenset, kwargs: Dict[str, Any]) -> None:
+    if kwargs.keys() <= accepted: return
+    unexpected = ", ".join(sorted(kwargs.keys() - accepted))
+    raise TypeError(f"SupabaseAuthClient.{name}() got unexpected keyword argument(s): {unexpected}")
+
+
+def _client_method(name: str) -> Callable[..., Any]:
+    get_method = attrgetter(f"client.{name}")
+    func = getattr(SyncGoTrueClient, name)
+    accepted = _keyword_names(func)
+
+    @wraps(func)
+    def method(self: SupabaseAuthClient, *args, **kwargs):
+        if __debug__: _check_kwargs(name, accepted, kwargs)
+        return get_method(self)(*args, **kwargs)
+    return method
+
+
+def _async_client_method(name: str) -> Callable[..., Any]:
+    get_method = attrgetter(f"async_client.{name}")
+    func = getattr(AsyncGoTrueClient, name)
+    accepted = _keyword_names(func)
+
+    # some AsyncGoTrueClient methods (i.e. `on_auth_state_change`) are not coroutines
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def method(self: SupabaseAuthClient, *args, **kwargs):
+            if __debug__: _check_kwargs(f"async_{name}", accepted, kwargs)
+            return await get_method(self)(*args, **kwargs)
+    else:
+        @wraps(func)
+        async def method(self: SupabaseAuthClient, *args, **kwargs):
+            if __debug__: _check_kwargs(f"async_{name}", accepted, kwargs)
+            return get_method(self)(*args, **kwargs)
+    return method
+
+
+for _name in _CLIENT_METHODS:
+    for _attr, _method in (
+        (_name, _client_method(_name)),
+        (f"async_{_name}", _async_client_method(_name)),
+    ):
+        _method.__name__ = _attr
+        _method.__qualname__ = f"SupabaseAuthClient.{_attr}"
+        _method.__module__ = __name__
+        setattr(SupabaseAuthClient, _attr, _method)
+
+# async wrappers that can be swapped for the client's bound coroutine methods
+_ASYNC_BOUND_METHODS = tuple(
+    name for name in _CLIENT_METHODS 
+    if inspect.iscoroutinefunction(getattr(AsyncGoTrueClient, name))
+)
+
+
+"""
+AsyncGoTrueAPI / SyncGoTrueAPI
+Generated Methods
+"""
+
+# Plain passthroughs, `<name>` resolves to `sync_api.<name>` and `async_<name>` to `async_api.<name>`
+_API_METHODS = (
+    "create_user",
+    "list_users",
+    "sign_up_with_email",
+    "sign_in_with_email",
+    "sign_up_with_phone",
+    "sign_in_with_phone",
+    "send_magic_link_email",
+    "send_mobile_otp",
+    "verify_mobile_otp",
+    "invite_user_by_email",
+    "reset_password_for_email",
+    "get_url_for_provider",
+    "refresh_access_token",
+    "generate_link",
+)
+
+
+def _api_method(attr: str, api: str, name: str, func: Callable[..., Any]) -> cached_property:
+    """
+    The api's bound method is cached on first access,
+    so calls go straight to gotrue without a forwarding frame
+    """
+    get_method = attrgetter(f"{api}.{name}")
+
+    def method(self: SupabaseAuthClient) -> Callable[..., Any]:
+        return get_method(self)
+    method.__name__ = attr
+    # properties have no signature of their own, so it leads the docstring for help() and IDEs
+    signature = inspect.signature(func)
+    signature = signature.replace(parameters = list(signature.parameters.values())[1:])
+    method.__doc__ = f"{attr}{signature}\n\n{inspect.cleandoc(func.__doc__ or '')}"
+    return cached_property(method)
+
+
+for _name in _API_METHODS:
+    for _attr, _api, _cls in (
+        (_name, "sync_api", SyncGoTrueAPI),
+        (f"async_{_name}", "async_api", AsyncGoTrueAPI),
+    ):
+        setattr(SupabaseAuthClient, _attr, _api_method(_attr, _api, _name, getattr(_cls, _name)))
+
+
+# one client per url, along with the global key it was built with
+_auth_clients: Dict[str, Tuple[Optional[str], SupabaseAuthClient]] = {}
+_auth_clients_lock = threading.Lock()
+
+
+def get_auth_client(url: Optional[str] = None) -> SupabaseAuthClient:
+    """
+    Returns the process-wide `SupabaseAuthClient` for the
+    given url and the current global key
+
+    When the key changes the previous client is replaced,
+    and its sync connection pool closed
+    """
+    url = url if url is not None else sb_settings.auth_url
+    key = sb_settings.key
+    entry = _auth_clients.get(url)
+    if entry is not None and entry[0] == key: return entry[1]
+    with _auth_clients_lock:
+        entry = _auth_clients.get(url)
+        if entry is not None and entry[0] == key: return entry[1]
+        client = SupabaseAuthClient(url = url)
+        _auth_clients[url] = (key, client)
+    # the async pool can only be closed from a running loop, it is released once collected
+    if entry is not None and "http_session" in entry[1].__dict__: entry[1].sync_http_client.close()
+    return client
+
+
+def get_client(url: Optional[str] = None) -> SyncGoTrueClient:
+    """
+    Returns the process-wide `SyncGoTrueClient`
+    """
+    return get_auth_client(url).client
+
+
+def get_async_client(url: Optional[str] = None) -> AsyncGoTrueClient:
+    """
+    Returns the process-wide `AsyncGoTrueClient`
+    """
+    return get_auth_client(url).async_client
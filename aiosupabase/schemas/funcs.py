@@ -1,11 +1,100 @@
+import httpx
+import asyncio
+import weakref
 import aiohttpx
 
-from typing import Dict, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
 from aiosupabase.utils.config import SupabaseSettings
 from aiosupabase.utils.config import settings as sb_settings
+from aiosupabase.utils.config import (
+    DEFAULT_FUNCTIONS_MAX_KEEPALIVE_CONNECTIONS,
+    DEFAULT_FUNCTIONS_MAX_CONNECTIONS,
+    DEFAULT_FUNCTIONS_KEEPALIVE_EXPIRY,
+    DEFAULT_FUNCTIONS_TIMEOUT,
+    DEFAULT_FUNCTIONS_EVICTION_INTERVAL,
+)
+from aiosupabase.utils.helpers import bearer, json_dumps, json_loads
 from lazyops.types import lazyproperty
 
 
+@lru_cache(maxsize = 256)
+def _function_url(base_url: str, function_name: str) -> httpx.URL:
+    """
+    The parsed url of a function, which httpx sends as is
+    """
+    return httpx.URL(f"{base_url}/{function_name}")
+
+
+async def _evict_idle_connections(ref: 'weakref.ReferenceType[FunctionsClient]', interval: float) -> None:
+    """
+    Periodically closes the pooled connections that outlived their keep-alive,
+    so a burst after a lull doesn't find them dropped by an intermediary.
+
+    Holds the client weakly so that it can still be garbage collected
+    """
+    while True:
+        await asyncio.sleep(interval)
+        client = ref()
+        if client is None or client._session is None: return
+        # httpcore internals, skipped if they are not available
+        async_client = client._session._async_client
+        pool = getattr(getattr(async_client, '_transport', None), '_pool', None)
+        del client
+        if pool is None or not hasattr(pool, '_close_expired_connections'): continue
+        async with pool._pool_lock:
+            await pool._close_expired_connections()
+
+
+def _json_headers(headers: Optional[Dict[str, str]], session_headers: httpx.Headers) -> Optional[Dict[str, str]]:
+    """
+    The request headers for a json body, with the json content type
+    unless the caller or the session already sets one
+    """
+    if "content-type" in session_headers: return headers
+    if headers and any(key.lower() == "content-type" for key in headers): return headers
+    return {**(headers or {}), "Content-Type": "application/json"}
+
+
+def _ok(data: Any) -> Dict[str, Any]:
+    return {"data": data, "error": None}
+
+
+def _error(error: Any) -> Dict[str, Any]:
+    return {"data": None, "error": error}
+
+
+class InvokeOptions:
+    """
+    Options for `FunctionsClient.invoke`
+
+    Dicts of the form `{"headers": ..., "body": ..., "responseType": ...}`
+    are still accepted and converted once per call
+    """
+
+    __slots__ = ("headers", "body", "response_type")
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[Any] = None,
+        response_type: Optional[str] = None,
+    ):
+        self.headers = headers
+        self.body = body
+        self.response_type = response_type
+
+    @classmethod
+    def parse(cls, options: Optional[Union['InvokeOptions', Dict]]) -> 'InvokeOptions':
+        if type(options) is cls: return options
+        if not options: return cls()
+        return cls(
+            headers = options.get('headers'),
+            body = options.get('body'),
+            response_type = options.get('responseType', options.get('response_type')),
+        )
+
 
 class FunctionsClient:
     def __init__(
@@ -13,18 +102,53 @@ class FunctionsClient:
         url: Optional[str] = None,
         headers: Optional[Dict] = None,
         settings: Optional[SupabaseSettings] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+        session: Optional[aiohttpx.Client] = None,
+        key: Optional[str] = None,
     ):
-        self.settings = settings if settings is None else sb_settings
+        self.settings = settings if settings is not None else sb_settings
+        # resolved once, rather than read through the settings on every use
         self.url = url if url is not None else self.settings.functions_url
-        self.default_headers = headers if headers is not None else self.settings.default_headers
-        self._session: aiohttpx.Client = None
+        self.key = key if key is not None else self.settings.key
+        # copied, since `set_auth` updates it in place
+        self.default_headers = dict(headers if headers is not None else self.settings.default_headers)
+        # Shared connection pools, if provided
+        self.transport = transport
+        self.async_transport = async_transport
+        # A borrowed session is used as is and never closed by this client
+        self._session: aiohttpx.Client = session
+        self._owns_session = session is None
+        self._eviction_task: Optional[asyncio.Task] = None
+        # merged headers (without and with a json body) and timeout per httpx client, see `_build_request`
+        self._request_templates: Dict[Union[httpx.Client, httpx.AsyncClient], Tuple[httpx.Headers, httpx.Headers, Dict[str, Any]]] = {}
 
 
     @property
     def session(self) -> aiohttpx.Client:
-        if self._session is None: self._session = self.create_session()
+        if self._session is None: 
+            self._session = self.create_session()
+            self._start_eviction()
         return self._session
 
+    def _start_eviction(self) -> None:
+        """
+        Starts the idle connection eviction when used within an event loop
+        """
+        if self._eviction_task is not None or not self._owns_session: return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._eviction_task = loop.create_task(
+            _evict_idle_connections(weakref.ref(self), DEFAULT_FUNCTIONS_EVICTION_INTERVAL)
+        )
+
+    def _stop_eviction(self) -> None:
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+            self._eviction_task = None
+
     def create_session(
         self,
         base_url: Optional[str] = None,
@@ -32,19 +156,54 @@ class FunctionsClient:
     ) -> aiohttpx.Client:
         base_url = base_url if base_url is not None else self.url
         headers = headers if headers is not None else self.headers
+        # a long-lived pool so repeated invocations reuse (and multiplex) connections,
+        # the limits only apply when a shared transport is not provided
         return aiohttpx.Client(
             base_url = base_url,
             headers = headers,
+            transport = self.transport,
+            async_transport = self.async_transport,
+            limits = httpx.Limits(
+                max_keepalive_connections = DEFAULT_FUNCTIONS_MAX_KEEPALIVE_CONNECTIONS,
+                max_connections = DEFAULT_FUNCTIONS_MAX_CONNECTIONS,
+                keepalive_expiry = DEFAULT_FUNCTIONS_KEEPALIVE_EXPIRY,
+            ),
+            timeout = httpx.Timeout(**DEFAULT_FUNCTIONS_TIMEOUT),
+            http2 = self.settings.http2_enabled,
         )
 
 
+    def _build_request(
+        self, 
+        client: Union[httpx.Client, httpx.AsyncClient], 
+        url: httpx.URL, 
+        content: Optional[bytes] = None,
+    ) -> httpx.Request:
+        """
+        Builds a POST request from the client's merged headers and timeout,
+        which are resolved once instead of by `build_request` on every call
+        """
+        template = self._request_templates.get(client)
+        if template is None:
+            headers = httpx.Headers(client.headers)
+            json_headers = headers.copy()
+            json_headers.setdefault("Content-Type", "application/json")
+            template = self._request_templates[client] = (headers, json_headers, {"timeout": client.timeout.as_dict()})
+        headers, json_headers, extensions = template
+        if content is not None: headers = json_headers
+        return httpx.Request('POST', url, headers = headers, content = content, extensions = dict(extensions))
+
     @lazyproperty
-    def headers(self):
-        _headers = self.default_headers.copy()
-        if self.settings.key:
-            _headers["apiKey"] = self.settings.key
-            _headers["Authorization"] = f"Bearer {self.settings.key}"
-        return _headers
+    def headers(self) -> Mapping[str, str]:
+        """
+        Read-only, so the session and callers can share it without copying
+        """
+        _headers = dict(self.default_headers)
+        if self.key:
+            _headers["apiKey"] = self.key
+            # a token from `set_auth` takes precedence over the key
+            _headers.setdefault("Authorization", bearer(self.key))
+        return MappingProxyType(_headers)
 
     def set_auth(self, token: str) -> None:
         """Updates the authorization header
@@ -54,22 +213,31 @@ class FunctionsClient:
         token : str
             the new jwt token sent in the authorisation header
         """
-        if self._session:
-            self.session.headers["Authorization"] = f"Bearer {token}"
-        else:
-            self.default_headers["Authorization"] = f"Bearer {token}"
+        authorization = f"Bearer {token}"
+        self.default_headers["Authorization"] = authorization
+        self.__dict__.pop("headers", None)
+        session = self._session
+        if session is None: return
+        # update the live httpx clients in place, and the config for the ones created later.
+        # `headers` is read-only, aiohttpx gets a plain copy it can still update
+        for client in (session._sync_client, session._async_client):
+            if client is not None: client.headers["Authorization"] = authorization
+        session._config.headers = dict(self.headers)
+        self._request_templates.clear()
         
 
-    def invoke(self, function_name: str, invoke_options: Dict) -> Dict:
+    def invoke(self, function_name: str, invoke_options: Optional[Union[InvokeOptions, Dict]] = None) -> Dict:
         """Invokes a function
 
         Parameters
         ----------
         function_name : the name of the function to invoke
-        invoke_options : object with the following properties
+        invoke_options : InvokeOptions or a dict with the following properties
             `headers`: object representing the headers to send with the request
             `body`: the body of the request
-            `responseType`: how the response should be parsed. The default is `json`
+            `responseType`: how the response should be parsed. The default is `json`,
+                `stream` returns a context manager yielding the unread `httpx.Response`
+                (`with data as response: for chunk in response.iter_bytes(): ...`)
 
         Returns
         -------
@@ -77,36 +245,43 @@ class FunctionsClient:
             Dictionary with data and/or error message
         """
         try:
-            headers = {**self.headers, **invoke_options.get('headers', {})}
-            body = invoke_options.get('body')
-            response_type = invoke_options.get('responseType')
-            response = self.session.post(
-                f"{self.url}/{function_name}", headers=headers, json=body)
-            is_relay_error = response.headers.get('x-relay-header')
-            if is_relay_error and is_relay_error == 'true':
-                return {
-                    "data": None,
-                    "error": response.text
-                }
-            data = response.json() if response_type == 'json' else response.content
-            return {"data": data, "error": None}
-        except Exception as e:
-            return {
-                "data": None,
-                "error": e
-            }
-
-
-    async def async_invoke(self, function_name: str, invoke_options: Dict) -> Dict:
+            options = InvokeOptions.parse(invoke_options)
+            # the session already sends `self.headers`, only pass the extra ones to merge
+            headers = options.headers or None
+            body = options.body
+            response_type = options.response_type
+            url = _function_url(self.url, function_name)
+            content = json_dumps(body) if body is not None else None
+            client = self.session.sync_client
+            if response_type != 'stream' and headers is None and not client.cookies:
+                response = client.send(self._build_request(client, url, content))
+            else:
+                if content is not None: headers = _json_headers(headers, client.headers)
+                if response_type == 'stream':
+                    # the request is only sent once the caller enters the context manager
+                    return _ok(self.session.stream('POST', url, headers=headers, content=content))
+                response = self.session.post(url, headers=headers, content=content)
+            if response.headers.get('x-relay-header') == 'true':
+                return _error(response.text)
+            data = json_loads(response.content) if response_type == 'json' else response.content
+            return _ok(data)
+        # transport failures and undecodable json bodies, anything else is a bug and is raised
+        except (httpx.HTTPError, ValueError) as e:
+            return _error(e)
+
+
+    async def async_invoke(self, function_name: str, invoke_options: Optional[Union[InvokeOptions, Dict]] = None) -> Dict:
         """Invokes a function
 
         Parameters
         ----------
         function_name : the name of the function to invoke
-        invoke_options : object with the following properties
+        invoke_options : InvokeOptions or a dict with the following properties
             `headers`: object representing the headers to send with the request
             `body`: the body of the request
-            `responseType`: how the response should be parsed. The default is `json`
+            `responseType`: how the response should be parsed. The default is `json`,
+                `stream` returns an async context manager yielding the unread `httpx.Response`
+                (`async with data as response: async for chunk in response.aiter_bytes(): ...`)
 
         Returns
         -------
@@ -114,24 +289,29 @@ class FunctionsClient:
             Dictionary with data and/or error message
         """
         try:
-            headers = {**self.headers, **invoke_options.get('headers', {})}
-            body = invoke_options.get('body')
-            response_type = invoke_options.get('responseType')
-            response = await self.session.async_post(
-                f"{self.url}/{function_name}", headers=headers, json=body)
-            is_relay_error = response.headers.get('x-relay-header')
-            if is_relay_error and is_relay_error == 'true':
-                return {
-                    "data": None,
-                    "error": response.text
-                }
-            data = response.json() if response_type == 'json' else response.content
-            return {"data": data, "error": None}
-        except Exception as e:
-            return {
-                "data": None,
-                "error": e
-            }
+            options = InvokeOptions.parse(invoke_options)
+            # the session already sends `self.headers`, only pass the extra ones to merge
+            headers = options.headers or None
+            body = options.body
+            response_type = options.response_type
+            url = _function_url(self.url, function_name)
+            content = json_dumps(body) if body is not None else None
+            client = self.session.async_client
+            if response_type != 'stream' and headers is None and not client.cookies:
+                response = await client.send(self._build_request(client, url, content))
+            else:
+                if content is not None: headers = _json_headers(headers, client.headers)
+                if response_type == 'stream':
+                    # the request is only sent once the caller enters the context manager
+                    return _ok(self.session.async_stream('POST', url, headers=headers, content=content))
+                response = await self.session.async_post(url, headers=headers, content=content)
+            if response.headers.get('x-relay-header') == 'true':
+                return _error(response.text)
+            data = json_loads(response.content) if response_type == 'json' else response.content
+            return _ok(data)
+        # transport failures and undecodable json bodies, anything else is a bug and is raised
+        except (httpx.HTTPError, ValueError) as e:
+            return _error(e)
 
     
     async def __aenter__(self) -> 'FunctionsClient':
@@ -142,8 +322,11 @@ class FunctionsClient:
 
     async def aclose(self) -> None:
         """Close the underlying HTTP connections."""
-        if self._session is not None:
-            await self._session.aclose()
+        self._stop_eviction()
+        self._request_templates.clear()
+        if self._session is not None and self._owns_session:
+            # a pool passed in belongs to the caller, the session is only closed when it built its own
+            if self.async_transport is None: await self._session.aclose()
             self._session = None
     
     def __enter__(self) -> 'FunctionsClient':
@@ -154,7 +337,9 @@ class FunctionsClient:
 
     def close(self) -> None:
         """Close the underlying HTTP connections."""
-        if self._session is not None:
-            self._session.close()
+        self._stop_eviction()
+        self._request_templates.clear()
+        if self._session is not None and self._owns_session:
+            if self.transport is None: self._session.close()
             self._session = None
     
\ No newline at end of file
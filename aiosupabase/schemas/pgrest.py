@@ -1,16 +1,206 @@
+import time
+import httpx
+import threading
 import aiohttpx
 
-from typing import Dict, Optional, Union, Any, Callable
+from functools import lru_cache
+from typing import Dict, Optional, Union, Any, Callable, Tuple
 from postgrest import (
+    APIResponse,
     SyncFilterRequestBuilder, 
+    SyncQueryRequestBuilder,
     SyncRequestBuilder,
+    SyncSelectRequestBuilder,
     AsyncRequestBuilder,
     AsyncFilterRequestBuilder,
-    
+    AsyncQueryRequestBuilder,
+    AsyncSelectRequestBuilder,
 )
-from aiosupabase.utils.config import SupabaseSettings
+from postgrest.base_request_builder import CountMethod, pre_select
+from aiosupabase.utils.config import SupabaseSettings, DEFAULT_PREWARM_TIMEOUT
 from aiosupabase.utils.config import settings as sb_settings
-from lazyops.types import lazyproperty
+from aiosupabase.utils.helpers import api_headers, detach_session, close_transports, aclose_transports
+
+# `QueryParams` is immutable, the filters replace it with `params.add(...)`.
+# `Headers` is not shared since `range()` / `single()` set headers in place
+_EMPTY_QUERY = aiohttpx.QueryParams()
+_BEARER_PREFIX = "Bearer "
+
+
+@lru_cache(maxsize = 256)
+def _table_path(table: str) -> str:
+    return f"/{table}"
+
+
+@lru_cache(maxsize = 64)
+def _basic_auth_header(username: Union[str, bytes], password: Union[str, bytes]) -> str:
+    return aiohttpx.BasicAuth(username, password)._auth_header
+
+
+class _QueryCache:
+    """
+    A TTL + LRU cache of the responses to postgrest GET requests,
+    keyed on the path, query params and headers
+
+    Cached responses are shared between callers and should be treated as read-only
+    """
+
+    __slots__ = ("maxsize", "ttl", "entries", "lock")
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: Dict[Tuple, Tuple[APIResponse, float]] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(builder: Union[SyncSelectRequestBuilder, AsyncSelectRequestBuilder]) -> Tuple:
+        # the session headers carry the auth token and schema, which change the results
+        return (
+            builder.path,
+            tuple(sorted(builder.params.multi_items())),
+            tuple(builder.headers.raw),
+            tuple(builder.session.headers.raw),
+        )
+
+    def get(self, key: Tuple) -> Optional[APIResponse]:
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None or entry[1] <= time.monotonic(): return None
+            # re-inserted as the most recently used
+            self.entries[key] = entry
+            return entry[0]
+
+    def set(self, key: Tuple, response: APIResponse) -> APIResponse:
+        with self.lock:
+            entries = self.entries
+            if len(entries) >= self.maxsize: entries.pop(next(iter(entries)), None)
+            entries[key] = (response, time.monotonic() + self.ttl)
+        return response
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        if table is None:
+            with self.lock: return self.entries.clear()
+        self.invalidate_path(_table_path(table))
+
+    def invalidate_path(self, path: str) -> None:
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == path]: del self.entries[key]
+
+
+class _CachedSyncSelectRequestBuilder(SyncSelectRequestBuilder):
+    def __init__(self, cache: _QueryCache, *args):
+        super().__init__(*args)
+        self.cache = cache
+
+    def execute(self) -> APIResponse:
+        if self.http_method != "GET": return super().execute()
+        key = self.cache.key(self)
+        response = self.cache.get(key)
+        if response is None: response = self.cache.set(key, super().execute())
+        return response
+
+
+class _CachedAsyncSelectRequestBuilder(AsyncSelectRequestBuilder):
+    def __init__(self, cache: _QueryCache, *args):
+        super().__init__(*args)
+        self.cache = cache
+
+    async def execute(self) -> APIResponse:
+        if self.http_method != "GET": return await super().execute()
+        key = self.cache.key(self)
+        response = self.cache.get(key)
+        if response is None: response = self.cache.set(key, await super().execute())
+        return response
+
+
+# writes drop the cached reads of their table once they complete
+class _CachedSyncQueryRequestBuilder(SyncQueryRequestBuilder):
+    def __init__(self, cache: _QueryCache, *args):
+        super().__init__(*args)
+        self.cache = cache
+
+    def execute(self) -> APIResponse:
+        try: return super().execute()
+        finally: self.cache.invalidate_path(self.path)
+
+
+class _CachedAsyncQueryRequestBuilder(AsyncQueryRequestBuilder):
+    def __init__(self, cache: _QueryCache, *args):
+        super().__init__(*args)
+        self.cache = cache
+
+    async def execute(self) -> APIResponse:
+        try: return await super().execute()
+        finally: self.cache.invalidate_path(self.path)
+
+
+class _CachedSyncFilterRequestBuilder(SyncFilterRequestBuilder):
+    def __init__(self, cache: _QueryCache, *args):
+        super().__init__(*args)
+        self.cache = cache
+
+    def execute(self) -> APIResponse:
+        try: return super().execute()
+        finally: self.cache.invalidate_path(self.path)
+
+
+class _CachedAsyncFilterRequestBuilder(AsyncFilterRequestBuilder):
+    def __init__(self, cache: _QueryCache, *args):
+        super().__init__(*args)
+        self.cache = cache
+
+    async def execute(self) -> APIResponse:
+        try: return await super().execute()
+        finally: self.cache.invalidate_path(self.path)
+
+
+def _rebuild(cls: type, cache: _QueryCache, builder: Any) -> Any:
+    return cls(cache, builder.session, builder.path, builder.http_method, builder.headers, builder.params, builder.json)
+
+
+class _CachedSyncRequestBuilder(SyncRequestBuilder):
+    def __init__(self, cache: _QueryCache, *args):
+        super().__init__(*args)
+        self.cache = cache
+
+    def select(self, *columns: str, count: Optional[CountMethod] = None) -> _CachedSyncSelectRequestBuilder:
+        method, params, headers, json = pre_select(*columns, count = count)
+        return _CachedSyncSelectRequestBuilder(self.cache, self.session, self.path, method, headers, params, json)
+
+    def insert(self, *args, **kwargs) -> _CachedSyncQueryRequestBuilder:
+        return _rebuild(_CachedSyncQueryRequestBuilder, self.cache, super().insert(*args, **kwargs))
+
+    def upsert(self, *args, **kwargs) -> _CachedSyncQueryRequestBuilder:
+        return _rebuild(_CachedSyncQueryRequestBuilder, self.cache, super().upsert(*args, **kwargs))
+
+    def update(self, *args, **kwargs) -> _CachedSyncFilterRequestBuilder:
+        return _rebuild(_CachedSyncFilterRequestBuilder, self.cache, super().update(*args, **kwargs))
+
+    def delete(self, *args, **kwargs) -> _CachedSyncFilterRequestBuilder:
+        return _rebuild(_CachedSyncFilterRequestBuilder, self.cache, super().delete(*args, **kwargs))
+
+
+class _CachedAsyncRequestBuilder(AsyncRequestBuilder):
+    def __init__(self, cache: _QueryCache, *args):
+        super().__init__(*args)
+        self.cache = cache
+
+    def select(self, *columns: str, count: Optional[CountMethod] = None) -> _CachedAsyncSelectRequestBuilder:
+        method, params, headers, json = pre_select(*columns, count = count)
+        return _CachedAsyncSelectRequestBuilder(self.cache, self.session, self.path, method, headers, params, json)
+
+    def insert(self, *args, **kwargs) -> _CachedAsyncQueryRequestBuilder:
+        return _rebuild(_CachedAsyncQueryRequestBuilder, self.cache, super().insert(*args, **kwargs))
+
+    def upsert(self, *args, **kwargs) -> _CachedAsyncQueryRequestBuilder:
+        return _rebuild(_CachedAsyncQueryRequestBuilder, self.cache, super().upsert(*args, **kwargs))
+
+    def update(self, *args, **kwargs) -> _CachedAsyncFilterRequestBuilder:
+        return _rebuild(_CachedAsyncFilterRequestBuilder, self.cache, super().update(*args, **kwargs))
+
+    def delete(self, *args, **kwargs) -> _CachedAsyncFilterRequestBuilder:
+        return _rebuild(_CachedAsyncFilterRequestBuilder, self.cache, super().delete(*args, **kwargs))
 
 
 class SupabasePostgrestClient:
@@ -20,6 +210,13 @@ class SupabasePostgrestClient:
     async and sync
     """
 
+    __slots__ = (
+        "settings", "url", "key", "default_headers", "timeout", "_schema",
+        "transport", "async_transport", "_shared_key", "_session", "_headers",
+        "_query_cache",
+    )
+    _init_lock = threading.Lock()
+
     def __init__(
         self,
         url: Optional[str] = None,
@@ -28,16 +225,27 @@ class SupabasePostgrestClient:
         schema: Optional[str] = None,
         timeout: Optional[int] = None,
         settings: Optional[SupabaseSettings] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
     ):
 
-        self.settings = settings if settings is None else sb_settings
-        self.url = url if url is not None else self.settings.rest_url
-        self.key = key if key is not None else self.settings.key
-        self.default_headers = headers if headers is not None else self.settings.default_headers
-        self.timeout = timeout if timeout is not None else self.settings.timeout
-        self._schema = schema if schema is not None else self.settings.client_schema
+        self.settings = s = settings if settings is not None else sb_settings
+        self.url = url if url is not None else s.rest_url
+        self.key = key if key is not None else s.key
+        self.default_headers = headers if headers is not None else s.default_headers
+        self.timeout = timeout if timeout is not None else s.timeout
+        self._schema = schema if schema is not None else s.client_schema
 
+        # Shared connection pools, if provided
+        self.transport = transport
+        self.async_transport = async_transport
+        # the key of the pools taken from `settings.get_shared_transports`, if any
+        self._shared_key: Optional[Tuple[str, Tuple]] = None
         self._session: aiohttpx.Client = None
+        self._headers: Dict[str, str] = None
+        self._query_cache: Optional[_QueryCache] = (
+            _QueryCache(s.query_cache_size, s.query_cache_ttl) if s.enable_query_cache else None
+        )
         
 
     """
@@ -51,7 +259,9 @@ class SupabasePostgrestClient:
         Returns:
             :class:`SyncRequestBuilder`
         """
-        return SyncRequestBuilder(self.session.sync_client, f"/{table}")
+        if self._query_cache is not None:
+            return _CachedSyncRequestBuilder(self._query_cache, self.session.sync_client, _table_path(table))
+        return SyncRequestBuilder(self.session.sync_client, _table_path(table))
     
     def afrom_(self, table: str) -> AsyncRequestBuilder:
         """[Async] Perform a table operation.
@@ -61,23 +271,23 @@ class SupabasePostgrestClient:
         Returns:
             :class:`AsyncRequestBuilder`
         """
-        return AsyncRequestBuilder(self.session.async_client, f"/{table}")
-    
-    def table(self, table: str) -> SyncRequestBuilder:
-        """Alias to :meth:`from_`."""
-        return self.from_(table)
-    
-    def atable(self, table: str) -> AsyncRequestBuilder:
-        """[Async] Alias to :meth:`from_`."""
-        return self.afrom_(table)
-    
-    def from_table(self, table: str) -> SyncRequestBuilder:
-        """Alias to :meth:`from_`."""
-        return self.from_(table)
+        if self._query_cache is not None:
+            return _CachedAsyncRequestBuilder(self._query_cache, self.session.async_client, _table_path(table))
+        return AsyncRequestBuilder(self.session.async_client, _table_path(table))
     
-    def async_from_table(self, table: str) -> AsyncRequestBuilder:
-        """[Async] Alias to :meth:`from_`."""
-        return self.afrom_(table)
+    # Aliases
+    table = from_table = from_
+    atable = async_from_table = afrom_
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        """Drop the cached reads of a table, or of every table.
+
+        Only applies when `settings.enable_query_cache` is set.
+
+        Args:
+            table: The name of the table, all tables if omitted
+        """
+        if self._query_cache is not None: self._query_cache.invalidate(table)
 
     def rpc(self, func: str, params: dict) -> SyncFilterRequestBuilder:
         """Perform a stored procedure call.
@@ -102,7 +312,7 @@ class SupabasePostgrestClient:
             f"/rpc/{func}", 
             "POST", 
             aiohttpx.Headers(), 
-            aiohttpx.QueryParams(), 
+            _EMPTY_QUERY, 
             json = params
         )
 
@@ -129,24 +339,41 @@ class SupabasePostgrestClient:
             f"/rpc/{func}", 
             "POST", 
             aiohttpx.Headers(), 
-            aiohttpx.QueryParams(), 
+            _EMPTY_QUERY, 
             json = params
         )
 
-    @lazyproperty
-    def headers(self):
-        _headers = self.default_headers.copy()
-        if self.settings.key:
-            _headers["apiKey"] = self.settings.key
-            _headers["Authorization"] = f"Bearer {self.settings.key}"
-        _headers["Accept-Profile"] = self._schema
-        _headers["Content-Profile"] = self._schema
-        return _headers
+    @property
+    def headers(self) -> Dict[str, str]:
+        if self._headers is None:
+            s = self.settings
+            if self.default_headers is s.default_headers and self.key == s.key and self._schema == s.client_schema:
+                self._headers = dict(s.rest_headers)
+            else:
+                self._headers = api_headers(self.default_headers, self.key, self._schema)
+        return self._headers
+
+    def _set_header(self, key: str, value: str):
+        # the session validates `headers` into a copy of its own, which the httpx clients copy again
+        # when they are built. the live clients are updated in place, and the config for the ones created later
+        self.headers[key] = value
+        session = self._session
+        if session is None: return
+        for client in (session._sync_client, session._async_client):
+            if client is not None: client.headers[key] = value
+        session._config.headers = self.headers
 
     @property
     def session(self) -> aiohttpx.Client:
-        if self._session is None: self._session = self.create_session()
-        return self._session
+        session = self._session
+        if session is not None: return session
+        # only taken on a miss, so that racing threads do not both build a session
+        with self._init_lock:
+            if self._session is None:
+                if self.transport is None and self.async_transport is None:
+                    self._shared_key, self.transport, self.async_transport = self.settings.get_shared_transports(self.url)
+                self._session = self.create_session()
+            return self._session
 
     def create_session(
         self,
@@ -161,6 +388,10 @@ class SupabasePostgrestClient:
             base_url=base_url,
             headers=headers,
             timeout=timeout,
+            transport = self.transport,
+            async_transport = self.async_transport,
+            # only applies when no transports are given
+            http2 = self.settings.http2_enabled,
         )
 
     def auth(
@@ -179,34 +410,32 @@ class SupabasePostgrestClient:
         .. note::
             Bearer token is preferred if both ones are provided.
         """
-        if token:
-            if self._session:
-                self.session.headers["Authorization"] = f"Bearer {token}"
-            else:
-                self.default_headers["Authorization"] = f"Bearer {token}"
-        elif username:
-            if self._session:
-                self.session.auth = aiohttpx.BasicAuth(username, password)
-            else:
-                self.default_headers["Authorization"] = aiohttpx.BasicAuth(username, password)._auth_header
+        if token: authorization = _BEARER_PREFIX + token
+        elif username: authorization = _basic_auth_header(username, password)
         else:
             raise ValueError(
                 "Neither bearer token or basic authentication scheme is provided"
             )
+        self._set_header("Authorization", authorization)
         return self
     
     def schema(self, schema: str):
         """Switch to another schema."""
-        self.session.headers.update(
-            {
-                "Accept-Profile": schema,
-                "Content-Profile": schema,
-            }
-        )
+        self._set_header("Accept-Profile", schema)
+        self._set_header("Content-Profile", schema)
+        self._schema = schema
         return self
 
     
+    async def prewarm(self) -> None:
+        """Open the connection ahead of the first request, failures are left to it."""
+        try:
+            await self.session.async_client.head(self.url, timeout = DEFAULT_PREWARM_TIMEOUT)
+        except httpx.HTTPError:
+            pass
+
     async def __aenter__(self) -> 'SupabasePostgrestClient':
+        if self.settings.prewarm: await self.prewarm()
         return self
 
     async def __aexit__(self, exc_type, exc, tb) -> None:
@@ -214,9 +443,10 @@ class SupabasePostgrestClient:
 
     async def aclose(self) -> None:
         """Close the underlying HTTP connections."""
-        if self._session is not None:
-            await self._session.aclose()
-            self._session = None
+        session, pools = detach_session(self)
+        # a pool passed in belongs to the caller, the session is only closed when it built its own
+        if session is not None and self.async_transport is None: await session.aclose()
+        if pools is not None: await aclose_transports(*pools)
     
     def __enter__(self) -> 'SupabasePostgrestClient':
         return self
@@ -226,7 +456,7 @@ class SupabasePostgrestClient:
 
     def close(self) -> None:
         """Close the underlying HTTP connections."""
-        if self._session is not None:
-            self._session.close()
-            self._session = None
+        session, pools = detach_session(self)
+        if session is not None and self.transport is None: session.close()
+        if pools is not None: close_transports(*pools)
     
\ No newline at end of file
@@ -1,90 +1,72 @@
-from typing import Any, Callable
+from functools import lru_cache
+from typing import Any, Callable, Optional
 
 from realtime.connection import Socket
 from realtime.transformers import convert_change_data
 
 
+@lru_cache(maxsize = 512)
+def _topic_for(schema: str, table_name: str) -> str:
+    if table_name == "*": return f"realtime:{schema}"
+    return f"realtime:{schema}:{table_name}"
+
+
 class SupabaseRealtimeClient:
+
+    __slots__ = ("subscription",)
+
     def __init__(
         self, 
         socket: Socket, 
         schema: str, 
         table_name: str
     ):
-        topic = (
-            f"realtime:{schema}"
-            if table_name == "*"
-            else f"realtime:{schema}:{table_name}"
-        )
-        self.subscription = socket.set_channel(topic)
+        self.subscription = socket.set_channel(_topic_for(schema, table_name))
 
     @staticmethod
-    def get_payload_records(payload: Any):
-        records: dict = {"new": {}, "old": {}}
-        if payload.type in ["INSERT", "UPDATE"]:
-            records["new"] = payload.record
-            convert_change_data(payload.columns, payload.record)
-        if payload.type in ["UPDATE", "DELETE"]:
-            records["old"] = payload.record
-            convert_change_data(payload.columns, payload.old_record)
+    def get_payload_records(payload: Any, records: Optional[dict] = None):
+        if records is None: records = {"new": {}, "old": {}}
+        # `convert_change_data` returns the converted record rather than updating it
+        if payload.type in ("INSERT", "UPDATE"):
+            records["new"] = convert_change_data(payload.columns, payload.record)
+        if payload.type in ("UPDATE", "DELETE"):
+            records["old"] = convert_change_data(payload.columns, payload.old_record)
         return records
 
-    def on(self, event, callback: Callable[..., Any]):
+    @classmethod
+    def _payload_callback(cls, callback: Callable[..., Any]) -> Callable[[Any], None]:
         def cb(payload):
-            enriched_payload = {
+            # filled in place, so each event allocates a single dict
+            callback(cls.get_payload_records(payload, {
                 "schema": payload.schema,
                 "table": payload.table,
                 "commit_timestamp": payload.commit_timestamp,
                 "event_type": payload.type,
                 "new": {},
                 "old": {},
-            }
-            enriched_payload = {**enriched_payload, **self.get_payload_records(payload)}
-            callback(enriched_payload)
+            }))
+        return cb
 
-        self.subscription.join().on(event, cb)
+    def on(self, event, callback: Callable[..., Any]):
+        self.subscription.join().on(event, self._payload_callback(callback))
         return self
 
     async def async_on(self, event, callback: Callable[..., Any]):
-        def cb(payload):
-            enriched_payload = {
-                "schema": payload.schema,
-                "table": payload.table,
-                "commit_timestamp": payload.commit_timestamp,
-                "event_type": payload.type,
-                "new": {},
-                "old": {},
-            }
-            enriched_payload = {**enriched_payload, **self.get_payload_records(payload)}
-            callback(enriched_payload)
-
         await self.subscription._join()
-        self.subscription.on(event, cb)
+        self.subscription.on(event, self._payload_callback(callback))
         return self
 
+    def _on_state_change(self, channel, callback: Callable[..., Any]):
+        # listeners are called with the message payload
+        channel.on("ok", lambda *_: callback("SUBSCRIBED"))
+        channel.on("error", lambda x: callback("SUBSCRIPTION_ERROR", x))
+        channel.on("timeout", lambda *_: callback("RETRYING_AFTER_TIMEOUT"))
+        return channel
+
     def subscribe(self, callback: Callable[..., Any]):
         # TODO: Handle state change callbacks for error and close
-        self.subscription.join().on("ok", callback("SUBSCRIBED"))
-        self.subscription.join().on(
-            "error", lambda x: callback("SUBSCRIPTION_ERROR", x)
-        )
-        self.subscription.join().on(
-            "timeout", lambda: callback("RETRYING_AFTER_TIMEOUT")
-        )
-        return self.subscription
+        return self._on_state_change(self.subscription.join(), callback)
     
     async def async_subscribe(self, callback: Callable[..., Any]):
-
-        await self.subscription._join()
-        self.subscription.on("ok", callback("SUBSCRIBED"))
-
-        await self.subscription._join()
-        self.subscription.on(
-            "error", lambda x: callback("SUBSCRIPTION_ERROR", x)
-        )
-
         await self.subscription._join()
-        self.subscription.on(
-            "timeout", lambda: callback("RETRYING_AFTER_TIMEOUT")
-        )
-        return self.subscription
\ No newline at end of file
+        return self._on_state_change(self.subscription, callback)
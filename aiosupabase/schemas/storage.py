@@ -1,11 +1,13 @@
+import httpx
+import threading
 import aiohttpx
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from storage3._async.file_api import AsyncBucketProxy
 from storage3._sync.file_api import SyncBucketProxy
 
-from aiosupabase.utils.config import SupabaseSettings
+from aiosupabase.utils.config import SupabaseSettings, DEFAULT_PREWARM_TIMEOUT
 from aiosupabase.utils.config import settings as sb_settings
-from lazyops.types import lazyproperty
+from aiosupabase.utils.helpers import api_headers, detach_session, close_transports, aclose_transports
 
 class SupabaseStorageClient:
     """
@@ -14,25 +16,46 @@ class SupabaseStorageClient:
     async and sync
     """
 
+    __slots__ = (
+        "settings", "url", "key", "default_headers",
+        "transport", "async_transport", "_shared_key", "_session", "_headers",
+    )
+    _init_lock = threading.Lock()
+
     def __init__(
         self,
         url: Optional[str] = None,
         key: Optional[str] = None,
         headers: Optional[Dict] = None,
         settings: Optional[SupabaseSettings] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
     ):
 
-        self.settings = settings if settings is None else sb_settings
-        self.url = url if url is not None else self.settings.storage_url
-        self.key = key if key is not None else self.settings.key
-        self.default_headers = headers if headers is not None else self.settings.default_headers
+        self.settings = s = settings if settings is not None else sb_settings
+        self.url = url if url is not None else s.storage_url
+        self.key = key if key is not None else s.key
+        self.default_headers = headers if headers is not None else s.default_headers
+        # Shared connection pools, if provided
+        self.transport = transport
+        self.async_transport = async_transport
+        # the key of the pools taken from `settings.get_shared_transports`, if any
+        self._shared_key: Optional[Tuple[str, Tuple]] = None
         self._session: aiohttpx.Client = None
+        self._headers: Dict[str, str] = None
 
 
     @property
     def session(self) -> aiohttpx.Client:
-        if self._session is None: self._session = self.create_session()
-        return self._session
+        session = self._session
+        if session is not None: return session
+        # only taken on a miss, so that racing threads do not both build a session
+        with self._init_lock:
+            if self._session is None:
+                if self.transport is None and self.async_transport is None:
+                    self._shared_key, self.transport, self.async_transport = self.settings.get_shared_transports(self.url)
+                self._session = self.create_session()
+            return self._session
 
     def create_session(
         self,
@@ -44,15 +67,21 @@ class SupabaseStorageClient:
         return aiohttpx.Client(
             base_url=base_url,
             headers=headers,
+            transport = self.transport,
+            async_transport = self.async_transport,
+            # only applies when no transports are given
+            http2 = self.settings.http2_enabled,
         )
 
-    @lazyproperty
-    def headers(self):
-        _headers = self.default_headers.copy()
-        if self.settings.key:
-            _headers["apiKey"] = self.settings.key
-            _headers["Authorization"] = f"Bearer {self.settings.key}"
-        return _headers
+    @property
+    def headers(self) -> Dict[str, str]:
+        if self._headers is None:
+            s = self.settings
+            if self.default_headers is s.default_headers and self.key == s.key:
+                self._headers = dict(s.storage_headers)
+            else:
+                self._headers = api_headers(self.default_headers, self.key)
+        return self._headers
 
     """
     Functions
@@ -86,7 +115,15 @@ class SupabaseStorageClient:
     def AsyncStorageFileAPI(self, id_: str) -> AsyncBucketProxy:
         return self.afrom_(id_)
 
+    async def prewarm(self) -> None:
+        """Open the connection ahead of the first request, failures are left to it."""
+        try:
+            await self.session.async_client.head(self.url, timeout = DEFAULT_PREWARM_TIMEOUT)
+        except httpx.HTTPError:
+            pass
+
     async def __aenter__(self) -> 'SupabaseStorageClient':
+        if self.settings.prewarm: await self.prewarm()
         return self
 
     async def __aexit__(self, exc_type, exc, tb) -> None:
@@ -94,9 +131,10 @@ class SupabaseStorageClient:
 
     async def aclose(self) -> None:
         """Close the underlying HTTP connections."""
-        if self._session is not None:
-            await self._session.aclose()
-            self._session = None
+        session, pools = detach_session(self)
+        # a pool passed in belongs to the caller, the session is only closed when it built its own
+        if session is not None and self.async_transport is None: await session.aclose()
+        if pools is not None: await aclose_transports(*pools)
     
     def __enter__(self) -> 'SupabaseStorageClient':
         return self
@@ -106,7 +144,7 @@ class SupabaseStorageClient:
 
     def close(self) -> None:
         """Close the underlying HTTP connections."""
-        if self._session is not None:
-            self._session.close()
-            self._session = None
+        session, pools = detach_session(self)
+        if session is not None and self.transport is None: session.close()
+        if pools is not None: close_transports(*pools)
     
\ No newline at end of file
@@ -1,15 +1,44 @@
+import os
 import re
-from urllib.parse import urljoin
-from typing import Optional, Dict, Union, Any
+import threading
+import importlib.util
+from types import MappingProxyType
+from urllib.parse import urlsplit
+from functools import lru_cache
+from typing import Optional, Dict, Union, Any, Callable, Mapping, Tuple, List, Type, TYPE_CHECKING
 
-from lazyops.types import validator, BaseSettings, lazyproperty
+from pydantic import PrivateAttr
+from lazyops.types import validator, BaseSettings
 from aiosupabase.version import VERSION
+from aiosupabase.utils.helpers import api_headers, json_loads
 
 DEFAULT_POSTGREST_CLIENT_HEADERS = {
     "Accept": "application/json",
     "Content-Type": "application/json",
 }
 DEFAULT_POSTGREST_CLIENT_TIMEOUT = 5
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 100
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_QUERY_CACHE_TTL = 30
+DEFAULT_QUERY_CACHE_SIZE = 1024
+DEFAULT_PREWARM_TIMEOUT = 2.0
+
+# Functions Client, sized for bursts of invocations to the same host
+DEFAULT_FUNCTIONS_MAX_KEEPALIVE_CONNECTIONS = 100
+DEFAULT_FUNCTIONS_MAX_CONNECTIONS = 200
+DEFAULT_FUNCTIONS_KEEPALIVE_EXPIRY = 85.0
+DEFAULT_FUNCTIONS_TIMEOUT = {"connect": 5.0, "read": 30.0, "write": 10.0, "pool": 5.0}
+# how often idle connections past their keep-alive expiry are closed
+DEFAULT_FUNCTIONS_EVICTION_INTERVAL = 30.0
+
+# httpx only supports http2 when `h2` is installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_URL_RE = re.compile(r"^(https?)://.+")
+_KEY_RE = re.compile(r"^[A-Za-z0-9-_=]+\.[A-Za-z0-9-_=]+\.?[A-Za-z0-9-_.+/=]*$")
+_PLATFORM_RE = re.compile(r"supabase\.(?:co|in)")
+
 COOKIE_OPTIONS = {
     "name": "sb:token",
     "lifetime": 60 * 60 * 8,
@@ -21,6 +50,66 @@ COOKIE_OPTIONS = {
 
 from aiosupabase.types.errors import SupabaseException
 
+if TYPE_CHECKING:
+    import httpx
+
+# (origin, limits) -> [transport, async_transport, refcount]
+_shared_transports: Dict[Tuple[str, Tuple], List[Any]] = {}
+_shared_transports_lock = threading.Lock()
+
+
+@lru_cache(maxsize = None)
+def _env_fields(cls: Type[BaseSettings]) -> Tuple[Tuple[str, str, bool], ...]:
+    """
+    The (env var, field name, is json) of each settings field
+    """
+    prefix = cls.__config__.env_prefix.upper()
+    return tuple(
+        (f"{prefix}{name.upper()}", name, field.is_complex())
+        for name, field in cls.__fields__.items()
+    )
+
+
+def _read_env(settings: BaseSettings) -> Dict[str, Any]:
+    """
+    A settings source that only looks up the known `SUPABASE_*` variables,
+    rather than pydantic's copy of the whole environment plus dotenv / secrets files
+    """
+    environ = os.environ
+    values: Dict[str, Any] = {}
+    for env_name, name, is_json in _env_fields(type(settings)):
+        value = environ.get(env_name)
+        if value is None: value = environ.get(env_name.lower())
+        if value is None: continue
+        if is_json:
+            try:
+                value = json_loads(value)
+            except ValueError as e:
+                raise SupabaseException(f"Invalid JSON in {env_name}: {e}") from e
+        values[name] = value
+    return values
+
+class _cached_setting:
+    """
+    A `lazyproperty` for `SupabaseSettings` that is stored in the private `_cache`,
+    so that it stays out of `dict()` / `json()`. Cleared by `configure`
+    """
+
+    def __init__(self, func: Callable[[Any], Any]):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance: Any, owner: Any = None) -> Any:
+        if instance is None: return self
+        cache = instance._cache
+        try:
+            return cache[self.name]
+        except KeyError:
+            value = cache[self.name] = self.func(instance)
+            return value
+
+
 class SupabaseSettings(BaseSettings):
 
     url: Optional[str] = None
@@ -35,69 +124,189 @@ class SupabaseSettings(BaseSettings):
 
     realtime_config: Optional[Dict[str, Any]] = None
     timeout: Optional[Union[int, float]] = DEFAULT_POSTGREST_CLIENT_TIMEOUT
+
+    # Connection Pool
+    max_connections: Optional[int] = DEFAULT_MAX_CONNECTIONS
+    max_keepalive_connections: Optional[int] = DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_EXPIRY
+    # multiplex requests over one connection per host, needs `h2`
+    http2: Optional[bool] = True
+    # open the connection when entering `async with` on a sub-client
+    prewarm: Optional[bool] = False
+
+    # Postgrest Client, opt-in cache of GET responses
+    enable_query_cache: Optional[bool] = False
+    query_cache_ttl: Optional[float] = DEFAULT_QUERY_CACHE_TTL
+    query_cache_size: Optional[int] = DEFAULT_QUERY_CACHE_SIZE
+    
+    # Set from `url` by `_recompute_urls`
+    rest_url: Optional[str] = None
+    realtime_url: Optional[str] = None
+    auth_url: Optional[str] = None
+    storage_url: Optional[str] = None
+    functions_url: Optional[str] = None
     
     # Auth Client
     cookie_options: Optional[Dict] = COOKIE_OPTIONS
     replace_default_headers: Optional[bool] = False
 
+    # derived values, see `_cached_setting`
+    _cache: Dict[str, Any] = PrivateAttr(default_factory = dict)
+
     class Config:
         env_prefix = "SUPABASE_"
         case_sensitive = False
+        keep_untouched = (_cached_setting,)
+
+        @classmethod
+        def customise_sources(cls, init_settings, env_settings, file_secret_settings):
+            return init_settings, _read_env
     
     @validator("url", pre = True, always = True)
     def validate_url(cls, value: str) -> str:
         if value is None: return value
-        if not re.match(r"^(https?)://.+", value):
+        if not _URL_RE.match(value):
             raise SupabaseException(f"Invalid URL: {value}")
         return value
 
     @validator("key", pre = True, always = True)
     def validate_key(cls, value: str) -> str:
         if value is None: return value
-        if not re.match(
-            r"^[A-Za-z0-9-_=]+\.[A-Za-z0-9-_=]+\.?[A-Za-z0-9-_.+/=]*$", value
-        ):
+        if not _KEY_RE.match(value):
             raise SupabaseException(f"Invalid key: {value}")
         return value
-    
-    @lazyproperty
-    def rest_url(self):
-        return urljoin(self.url, "/rest/v1")
-    
-    @lazyproperty
-    def realtime_url(self):
-        return urljoin(self.url, "/realtime/v1").replace("http", "ws")
-    
-    @lazyproperty
-    def auth_url(self):
-        return urljoin(self.url, "/auth/v1")
-    
-    @lazyproperty
-    def storage_url(self):
-        return urljoin(self.url, "/storage/v1")
 
-    @lazyproperty
-    def is_platform(self):
-        return re.search(r"(supabase\.co)|(supabase\.in)", self.url)
+    @validator("cookie_options")
+    def validate_cookie_options(cls, value: Optional[Union[Dict, Any]]) -> Optional[Union[Dict, Any]]:
+        # the default is left as is so that gotrue is not loaded on import,
+        # `SupabaseAuthClient` parses it once on first use
+        if not isinstance(value, dict) or value == COOKIE_OPTIONS: return value
+        from gotrue.types import CookieOptions
+        return CookieOptions.parse_obj(value)
     
-    @lazyproperty
-    def functions_url(self):
-        if self.is_platform:
-            url_parts = self.url.split(".")
-            return (
-                f"{url_parts[0]}.functions.{url_parts[1]}.{url_parts[2]}"
-            )
-        return urljoin(self.url, "/functions/v1")
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._recompute_urls()
 
+    def _recompute_urls(self):
+        """
+        Builds the service urls from `url`, called whenever it changes
+        """
+        if self.url is None:
+            self.rest_url = self.realtime_url = self.auth_url = self.storage_url = self.functions_url = None
+            return
+        base = self.url.rstrip("/")
+        self.rest_url = f"{base}/rest/v1"
+        self.realtime_url = f"ws{base[4:]}/realtime/v1"
+        self.auth_url = f"{base}/auth/v1"
+        self.storage_url = f"{base}/storage/v1"
+        if _PLATFORM_RE.search(base) is not None:
+            parts = urlsplit(base)
+            project, host = parts.netloc.split(".", 1)
+            self.functions_url = f"{parts.scheme}://{project}.functions.{host}"
+        else:
+            self.functions_url = f"{base}/functions/v1"
 
     @property
-    def default_headers(self):
-        return {
+    def is_platform(self) -> bool:
+        return self.url is not None and _PLATFORM_RE.search(self.url) is not None
+
+
+    @_cached_setting
+    def default_headers(self) -> Mapping[str, str]:
+        """
+        Read-only, reset by `configure`
+        """
+        return MappingProxyType({
             "X-Client-Info": f"aiosupabase/{VERSION}",
             "Accept": "application/json",
             "Content-Type": "application/json",
             **self.headers,
-        }
+        })
+
+    @_cached_setting
+    def rest_headers(self) -> Mapping[str, str]:
+        """
+        The default `SupabasePostgrestClient` headers, reset by `configure`
+        """
+        return MappingProxyType(api_headers(self.default_headers, self.key, self.client_schema))
+
+    @_cached_setting
+    def storage_headers(self) -> Mapping[str, str]:
+        """
+        The default `SupabaseStorageClient` headers, reset by `configure`
+        """
+        return MappingProxyType(api_headers(self.default_headers, self.key))
+
+    @_cached_setting
+    def limits(self) -> 'httpx.Limits':
+        import httpx
+        return httpx.Limits(
+            max_connections = self.max_connections,
+            max_keepalive_connections = self.max_keepalive_connections,
+            keepalive_expiry = self.keepalive_expiry,
+        )
+
+    @property
+    def http2_enabled(self) -> bool:
+        return bool(self.http2) and HTTP2_AVAILABLE
+
+    def _shared_transport_key(self, url: str) -> Tuple[str, Tuple]:
+        parts = urlsplit(url)
+        return (
+            f"{parts.scheme}://{parts.netloc}",
+            (self.max_connections, self.max_keepalive_connections, self.keepalive_expiry, self.http2_enabled),
+        )
+
+    def get_shared_transports(self, url: str) -> Tuple[Tuple[str, Tuple], 'httpx.HTTPTransport', 'httpx.AsyncHTTPTransport']:
+        """
+        Returns the sync and async connection pools shared by every
+        sub-client talking to the host of `url`, along with their key.
+
+        Each call must be paired with `release_shared_transports`, using the returned key
+        since the limits it is computed from may have been reconfigured in between
+        """
+        key = self._shared_transport_key(url)
+        with _shared_transports_lock:
+            entry = _shared_transports.get(key)
+            if entry is None:
+                import httpx
+                entry = _shared_transports[key] = [
+                    httpx.HTTPTransport(limits = self.limits, http2 = self.http2_enabled),
+                    httpx.AsyncHTTPTransport(limits = self.limits, http2 = self.http2_enabled),
+                    0,
+                ]
+            entry[2] += 1
+            return key, entry[0], entry[1]
+
+    @staticmethod
+    def release_shared_transports(key: Tuple[str, Tuple]) -> Optional[Tuple['httpx.HTTPTransport', 'httpx.AsyncHTTPTransport']]:
+        """
+        Releases a reference taken with `get_shared_transports`, returns
+        both pools for the caller to close once the last one is released
+        """
+        with _shared_transports_lock:
+            entry = _shared_transports.get(key)
+            if entry is None: return None
+            entry[2] -= 1
+            if entry[2] > 0: return None
+            del _shared_transports[key]
+            return entry[0], entry[1]
+
+    @_cached_setting
+    def auth_defaults(self) -> Mapping[str, Any]:
+        """
+        Read-only snapshot of the `SupabaseAuthClient` defaults,
+        reset by `configure`
+        """
+        return MappingProxyType({
+            "auth_url": self.auth_url,
+            "default_headers": self.default_headers,
+            "auto_refresh_token": self.auto_refresh_token,
+            "persist_session": self.persist_session,
+            "cookie_options": self.cookie_options,
+            "replace_default_headers": self.replace_default_headers,
+        })
 
 
     def configure(
@@ -114,6 +323,16 @@ class SupabaseSettings(BaseSettings):
         realtime_config: Optional[Dict[str, Any]] = None,
         timeout: Optional[Union[int, float]] = None,
 
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+        prewarm: Optional[bool] = None,
+
+        enable_query_cache: Optional[bool] = None,
+        query_cache_ttl: Optional[float] = None,
+        query_cache_size: Optional[int] = None,
+
         cookie_options: Optional[Dict] = None,
         replace_default_headers: Optional[bool] = None,
         **kwargs,
@@ -130,6 +349,14 @@ class SupabaseSettings(BaseSettings):
         :param persist_session: whether to persist the session
         :param realtime_config: the supabase realtime config
         :param timeout: the timeout in seconds
+        :param max_connections: the max number of connections per pool
+        :param max_keepalive_connections: the max number of idle connections kept per pool
+        :param keepalive_expiry: how long idle connections are kept, in seconds
+        :param http2: whether to use http2 when `h2` is installed
+        :param prewarm: whether to open the connection when entering `async with` on a sub-client
+        :param enable_query_cache: whether to cache postgrest GET responses
+        :param query_cache_ttl: how long responses are cached, in seconds
+        :param query_cache_size: the max number of cached responses per client
         :param cookie_options: the cookie options
         :param replace_default_headers: whether to replace the default headers
         """
@@ -143,12 +370,22 @@ class SupabaseSettings(BaseSettings):
         if persist_session is not None: self.persist_session = persist_session
         if realtime_config is not None: self.realtime_config = realtime_config
         if timeout is not None: self.timeout = timeout
-        if cookie_options is not None: self.cookie_options = cookie_options
+        if max_connections is not None: self.max_connections = max_connections
+        if max_keepalive_connections is not None: self.max_keepalive_connections = max_keepalive_connections
+        if keepalive_expiry is not None: self.keepalive_expiry = keepalive_expiry
+        if http2 is not None: self.http2 = http2
+        if prewarm is not None: self.prewarm = prewarm
+        if enable_query_cache is not None: self.enable_query_cache = enable_query_cache
+        if query_cache_ttl is not None: self.query_cache_ttl = query_cache_ttl
+        if query_cache_size is not None: self.query_cache_size = query_cache_size
+        if cookie_options is not None: self.cookie_options = self.validate_cookie_options(cookie_options)
         if replace_default_headers is not None: self.replace_default_headers = replace_default_headers
         for k,v in kwargs.items():
             if v is None: continue
             if hasattr(self, k):
                 setattr(self, k, v)
+        self._recompute_urls()
+        self._cache.clear()
 
 
 settings = SupabaseSettings()
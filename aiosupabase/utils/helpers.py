@@ -0,0 +1,177 @@
+import json
+import base64
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, Optional, Set, Tuple, Type, Union, TYPE_CHECKING
+from aiosupabase.utils import logger
+
+if TYPE_CHECKING:
+    import httpx
+
+try:
+    import orjson
+    _orjson_available = True
+except ImportError:
+    _orjson_available = False
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Serializes to JSON bytes, using `orjson` if it is installed
+    """
+    if _orjson_available: return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """
+    Parses JSON, using `orjson` if it is installed
+    """
+    if _orjson_available: return orjson.loads(data)
+    return json.loads(data)
+
+
+class cached_property:
+    """
+    A minimal, lock-free `functools.cached_property`
+
+    The computed value is stored in the instance `__dict__`
+    under the same name, so subsequent reads never reach the descriptor.
+    """
+
+    def __init__(self, func: Callable[[Any], Any]):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner: Type, name: str):
+        self.name = name
+
+    def __get__(self, instance: Optional[Any], owner: Optional[Type] = None) -> Any:
+        if instance is None: return self
+        value = instance.__dict__[self.name] = self.func(instance)
+        return value
+
+
+@lru_cache(maxsize = 16)
+def bearer(key: str) -> str:
+    """
+    The `Authorization` value for an API key, shared across all clients
+    """
+    return f"Bearer {key}"
+
+
+def api_headers(headers: Mapping[str, str], key: Optional[str] = None, schema: Optional[str] = None) -> Dict[str, str]:
+    """
+    A copy of `headers` with the api key and, for postgrest, the schema profile headers
+    """
+    _headers = dict(headers)
+    if key:
+        _headers["apiKey"] = key
+        _headers["Authorization"] = bearer(key)
+    if schema is not None:
+        _headers["Accept-Profile"] = schema
+        _headers["Content-Profile"] = schema
+    return _headers
+
+
+JWT_ALGORITHMS = frozenset((
+    "HS256", "HS384", "HS512",
+    "RS256", "RS384", "RS512",
+    "ES256", "ES384", "ES512",
+    "PS256", "PS384", "PS512",
+    "EdDSA",
+))
+
+
+def _decode_jwt_segment(segment: str) -> Optional[Dict[str, Any]]:
+    try:
+        value = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except Exception:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def looks_like_jwt(token: Any) -> bool:
+    """
+    A structural check of a JWT (three non-empty segments and a
+    decodable header with a known `alg`), the signature is not verified
+    """
+    if not isinstance(token, str) or token.count(".") != 2: return False
+    header, payload, signature = token.split(".")
+    if not header or not payload or not signature: return False
+    header = _decode_jwt_segment(header)
+    return header is not None and header.get("alg") in JWT_ALGORITHMS
+
+
+def decode_jwt_claims(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Decodes the claims of a JWT **without** verifying its signature
+
+    Only meant for reading hints such as `exp`, returns None
+    if the token is malformed
+    """
+    parts = token.split(".", 2)
+    return _decode_jwt_segment(parts[1]) if len(parts) == 3 else None
+
+
+def token_digest(*parts: str) -> str:
+    """
+    A compact cache key for (potentially long) tokens
+    """
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size = 16).hexdigest()
+
+
+# Keeps a reference to clients and pools being closed in the background
+_closing_tasks: Set[asyncio.Task] = set()
+
+
+def detach_session(client: Any) -> Tuple[Optional[Any], Optional[Tuple['httpx.HTTPTransport', 'httpx.AsyncHTTPTransport']]]:
+    """
+    Clears the session of a client that takes its pools from `settings.get_shared_transports`,
+    returning it unless it runs on the shared pools, along with both pools once the last reference is released
+    """
+    with client._init_lock:
+        session = client._session
+        if session is None: return None, None
+        client._session = None
+        key = client._shared_key
+        if key is None: return session, None
+        # closing the session would close the pools for the other clients as well
+        client._shared_key = None
+        client.transport = client.async_transport = None
+        return None, client.settings.release_shared_transports(key)
+
+
+def close_transports(transport: Optional['httpx.HTTPTransport'], async_transport: Optional['httpx.AsyncHTTPTransport']) -> None:
+    """
+    Closes a pair of pools from sync code.
+
+    The async pool is closed in the background when called within an event loop,
+    and on a temporary one otherwise
+    """
+    if transport is not None: transport.close()
+    if async_transport is None: return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        task = loop.create_task(async_transport.aclose())
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+        return
+    try:
+        asyncio.run(async_transport.aclose())
+    # connections opened on a loop that is gone can only be dropped
+    except Exception as e:
+        logger.error(f"Error closing connection pool: {e!r}")
+
+
+async def aclose_transports(transport: Optional['httpx.HTTPTransport'], async_transport: Optional['httpx.AsyncHTTPTransport']) -> None:
+    """
+    Closes a pair of pools from async code
+    """
+    if transport is not None: transport.close()
+    if async_transport is not None: await async_transport.aclose()
@@ -13,6 +13,7 @@ version = root.joinpath(f'{pkg_name}/version.py').read_text().split('VERSION = '
 
 requirements = [
     'aiohttpx',
+    'h2',
     'lazyops',
     'postgrest-py==0.10.3',
     'gotrue==0.5.4',
@@ -20,10 +21,9 @@ requirements = [
     'storage3==0.3.5',
 ]
 
-if sys.version_info.minor < 8:
-    requirements.append('typing_extensions')
-
-extras = {}
+extras = {
+    'fast': ['orjson'],
+}
 args = {
     'packages': find_packages(include = [f'{pkg_name}', f'{pkg_name}.*',]),
     'install_requires': requirements,
@@ -33,6 +33,7 @@ args = {
         "console_scripts": []
     },
     'extras_require': extras,
+    'python_requires': '>=3.8',
 }
 
 setup(
@@ -47,7 +48,7 @@ setup(
     classifiers=[
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
         'Topic :: Software Development :: Libraries',
     ],
     **args
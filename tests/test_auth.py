@@ -0,0 +1,202 @@
+import asyncio
+import base64
+import json
+import time
+
+import httpx
+import pytest
+from gotrue.exceptions import APIError
+from gotrue.types import CookieOptions
+
+from aiosupabase.schemas.auth import SupabaseAuthClient
+from aiosupabase.utils.config import SupabaseSettings
+
+
+def make_settings() -> SupabaseSettings:
+    return SupabaseSettings(url = "https://project.supabase.co", key = "a.b.c")
+
+
+def test_cookie_options_parsed_without_touching_settings():
+    settings = make_settings()
+    defaults = settings.auth_defaults
+    first = SupabaseAuthClient(settings = settings)
+    second = SupabaseAuthClient(settings = settings)
+    assert isinstance(first.cookie_options, CookieOptions)
+    assert first.cookie_options is second.cookie_options
+    # building a client must not reset the settings caches
+    assert settings.auth_defaults is defaults
+    assert isinstance(settings.cookie_options, dict)
+
+
+def test_http_session_uses_shared_transports():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200))
+    client = SupabaseAuthClient(settings = make_settings(), transport = transport)
+    assert client.sync_http_client._transport is transport
+    assert client.create_http_session().sync_client._transport is transport
+
+
+def make_jwt(**claims) -> str:
+    encode = lambda obj: base64.urlsafe_b64encode(json.dumps(obj).encode()).rstrip(b"=").decode()
+    return ".".join((encode({"alg": "HS256", "typ": "JWT"}), encode(claims), "signature"))
+
+
+USER_ID = "8b9f6a3e-2c1d-4e5f-9a7b-1c2d3e4f5a6b"
+USER = {"id": USER_ID, "app_metadata": {}, "user_metadata": {}, "aud": "authenticated", "created_at": "2024-01-01T00:00:00Z"}
+
+
+def make_user_client(calls: list, delay: float = 0.05) -> SupabaseAuthClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json = USER)
+    return SupabaseAuthClient(settings = make_settings(), async_transport = httpx.MockTransport(handler))
+
+
+def test_async_get_user_coalesces_requests():
+    calls = []
+    client = make_user_client(calls)
+    jwt = make_jwt(sub = "coalesce", exp = int(time.time()) + 3600)
+
+    async def run():
+        users = await asyncio.gather(*[client.async_get_user(jwt = jwt) for _ in range(5)])
+        assert all(str(user.id) == USER_ID for user in users)
+        # served from the cache afterwards
+        await client.async_get_user(jwt = jwt)
+
+    asyncio.run(run())
+    assert calls == ["/auth/v1/user"]
+
+
+def test_async_get_user_leader_cancel_keeps_flight():
+    calls = []
+    client = make_user_client(calls)
+    # no `exp`, so nothing is cached and only the in-flight request is shared
+    jwt = make_jwt(sub = "cancel")
+
+    async def run():
+        leader = asyncio.ensure_future(client.async_get_user(jwt = jwt))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(client.async_get_user(jwt = jwt))
+        await asyncio.sleep(0)
+        leader.cancel()
+        user = await follower
+        assert leader.cancelled()
+        assert str(user.id) == USER_ID
+
+    asyncio.run(run())
+    assert calls == ["/auth/v1/user"]
+
+
+def test_get_auth_client_replaced_on_key_change():
+    from aiosupabase.schemas.auth import get_auth_client
+    from aiosupabase.utils.config import settings
+
+    url, key = "https://project.supabase.co/auth/v1", settings.key
+    try:
+        settings.key = "first.key.value"
+        first = get_auth_client(url)
+        assert get_auth_client(url) is first
+        pool = first.sync_http_client
+        settings.key = "second.key.value"
+        second = get_auth_client(url)
+        assert second is not first
+        assert second.headers["apiKey"] == "second.key.value"
+        # the previous client is dropped and its pool closed
+        assert pool.is_closed
+        assert get_auth_client(url) is second
+    finally:
+        settings.key = key
+
+
+def make_sync_user_client(calls: list) -> SupabaseAuthClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path.endswith("/logout"): return httpx.Response(204)
+        return httpx.Response(200, json = USER)
+    return SupabaseAuthClient(settings = make_settings(), transport = httpx.MockTransport(handler))
+
+
+def test_get_user_cached_until_expiry():
+    calls = []
+    client = make_sync_user_client(calls)
+    jwt = make_jwt(sub = "cached", exp = int(time.time()) + 3600)
+    first = client.get_user(jwt = jwt)
+    assert client.get_user(jwt = jwt) is first
+    assert calls == ["/auth/v1/user"]
+    # signing out drops the cached user
+    client.sign_out(jwt = jwt)
+    client.get_user(jwt = jwt)
+    assert calls == ["/auth/v1/user", "/auth/v1/logout", "/auth/v1/user"]
+
+
+def test_get_user_not_cached_without_expiry():
+    calls = []
+    client = make_sync_user_client(calls)
+    # no `exp`, or one too close to be worth caching
+    for jwt in (make_jwt(sub = "no-exp"), make_jwt(sub = "expiring", exp = int(time.time()) + 1)):
+        client.get_user(jwt = jwt)
+        client.get_user(jwt = jwt)
+    assert len(calls) == 4
+
+
+@pytest.mark.parametrize("jwt", ["", "a.b", "a.b.c", "..", make_jwt(sub = "x")[:-len("signature")]])
+def test_get_user_rejects_malformed_jwt(jwt):
+    calls = []
+    client = make_sync_user_client(calls)
+    with pytest.raises(APIError):
+        client.get_user(jwt = jwt)
+    assert calls == []
+
+
+def test_close_api_only_client():
+    client = SupabaseAuthClient(settings = make_settings())
+    # only the api was used, its session must still be closed
+    client.sync_api, client.async_api
+    assert "client" not in client.__dict__
+    client.close()
+    assert client.sync_http_client.is_closed
+
+    async def run():
+        await client.aclose()
+        assert client.async_http_client.is_closed
+
+    asyncio.run(run())
+
+
+def test_close_leaves_passed_transports_open():
+    calls = []
+    client = make_sync_user_client(calls)
+    client.get_user(jwt = make_jwt(sub = "shared"))
+    client.close()
+    assert not client.sync_http_client.is_closed
+
+
+# the cache only reads `id` from the users
+class SimpleUser:
+    def __init__(self, id: str):
+        self.id = id
+
+
+def test_user_cache_concurrent_writes(monkeypatch):
+    import threading
+    from aiosupabase.schemas import auth
+
+    monkeypatch.setattr(auth, "_USER_CACHE_MAXSIZE", 8)
+    monkeypatch.setattr(SupabaseAuthClient, "_user_cache", {})
+    client = SupabaseAuthClient(settings = make_settings())
+    expires_at = time.time() + 3600
+    errors = []
+
+    def run(n: int):
+        try:
+            for i in range(500):
+                client._set_cached_user(f"{n}-{i}", expires_at, SimpleUser(f"{n}"))
+                client._evict_cached_user(uid = f"{(n + 1) % 4}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target = run, args = (n,)) for n in range(4)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert errors == []
+    assert len(SupabaseAuthClient._user_cache) <= 8
@@ -1,8 +1,159 @@
 import asyncio
 from aiosupabase.utils import logger
-from client import Supabase
+from aiosupabase.utils.config import SupabaseSettings
+from aiosupabase.utils.config import settings as sb_settings
+from aiosupabase.schemas.pgrest import SupabasePostgrestClient
+from aiosupabase.schemas.storage import SupabaseStorageClient
 
-async def run_test():
+
+def test_settings_fallback():
+    assert SupabasePostgrestClient().settings is sb_settings
+    assert SupabaseStorageClient().settings is sb_settings
+
+    settings = SupabaseSettings(url = "https://example.supabase.co")
+    assert SupabasePostgrestClient(settings = settings).settings is settings
+    assert SupabaseStorageClient(settings = settings).url == settings.storage_url
+
+
+def test_functions_url():
+    settings = SupabaseSettings(url = "https://project.supabase.co/")
+    assert settings.functions_url == "https://project.functions.supabase.co"
+
+    settings.configure(url = "http://localhost:54321")
+    assert settings.functions_url == "http://localhost:54321/functions/v1"
+
+
+def test_configure_with_settings_fields():
+    from aiosupabase.client import SupabaseAPI
+
+    settings = SupabaseSettings()
+    api = SupabaseAPI(settings = settings)
+    api.configure(
+        url = "https://example.supabase.co",
+        key = "a.b.c",
+        enable_query_cache = True,
+        http2 = False,
+        max_connections = 10,
+        keepalive_expiry = 5.0,
+        prewarm = True,
+        schema = "private",
+    )
+    assert settings.enable_query_cache and settings.prewarm and not settings.http2
+    assert settings.limits.max_connections == 10
+    assert api.api._schema == "private"
+    assert api.postgrest._query_cache is not None
+
+
+def make_client():
+    from aiosupabase.client import SupabaseClient
+    return SupabaseClient(settings = SupabaseSettings(url = "https://project.supabase.co", key = "a.b.c"))
+
+
+def test_sub_clients_share_transports():
+    client = make_client()
+    for sub in (client.postgrest, client.storage, client.functions):
+        assert sub.session.sync_client._transport is client.transport
+        assert sub.session.async_client._transport is client.async_transport
+    assert client.auth.sync_http_client._transport is client.transport
+
+
+def record_closed_transports(monkeypatch) -> list:
+    import httpx
+
+    closed = []
+    async def aclose(self): closed.append(self)
+    monkeypatch.setattr(httpx.HTTPTransport, "close", lambda self: closed.append(self))
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "aclose", aclose)
+    return closed
+
+
+def test_standalone_clients_share_transports(monkeypatch):
+    from aiosupabase.utils import config
+
+    closed = record_closed_transports(monkeypatch)
+    settings = SupabaseSettings(url = "https://shared.supabase.co", key = "a.b.c")
+    postgrest = SupabasePostgrestClient(settings = settings)
+    storage = SupabaseStorageClient(settings = settings)
+    transport = postgrest.session.sync_client._transport
+    async_transport = postgrest.session.async_client._transport
+    # same host and limits, so the same pools
+    assert storage.session.sync_client._transport is transport
+    key = settings._shared_transport_key(settings.rest_url)
+    assert config._shared_transports[key][2] == 2
+    # the pools stay open until the last client releases them, and are then both closed
+    postgrest.close()
+    assert closed == [] and config._shared_transports[key][2] == 1
+    storage.close()
+    assert closed == [transport, async_transport]
+    assert key not in config._shared_transports
+
+
+def test_shared_transports_released_after_configure(monkeypatch):
+    from aiosupabase.utils import config
+
+    closed = record_closed_transports(monkeypatch)
+    settings = SupabaseSettings(url = "https://reconfigured.supabase.co", key = "a.b.c")
+    postgrest = SupabasePostgrestClient(settings = settings)
+    key = settings._shared_transport_key(settings.rest_url)
+    transport = postgrest.session.sync_client._transport
+    # the limits are part of the key, the release must still use the original one
+    settings.configure(max_connections = 7)
+
+    async def run(): await postgrest.aclose()
+    asyncio.run(run())
+    assert key not in config._shared_transports
+    assert len(closed) == 2 and closed[0] is transport
+
+
+def test_sub_clients_leave_shared_transports_open(monkeypatch):
+    closed = record_closed_transports(monkeypatch)
+    client = make_client()
+    transports = [client.transport, client.async_transport]
+
+    async def run():
+        for sub in (client.postgrest, client.storage, client.functions):
+            sub.session.sync_client, sub.session.async_client
+        client.auth.sync_api, client.auth.async_api
+        async with client.postgrest: pass
+        for sub in (client.storage, client.functions, client.auth): await sub.aclose()
+        assert closed == []
+        # a session built afterwards still runs on the open pools
+        assert client.postgrest.session.async_client._transport is transports[1]
+        # both pools are closed, once, by the client that created them
+        await client.aclose()
+        await client.aclose()
+
+    asyncio.run(run())
+    assert closed == transports
+
+
+def test_close_closes_both_transports(monkeypatch):
+    closed = record_closed_transports(monkeypatch)
+    client = make_client()
+    client.postgrest.session.sync_client, client.auth.sync_api
+    transports = [client.transport, client.async_transport]
+    client.close()
+    client.close()
+    assert closed == transports
+
+
+def test_set_auth_skips_unchanged_credentials(monkeypatch):
+    calls = []
+    auth = SupabasePostgrestClient.auth
+    monkeypatch.setattr(SupabasePostgrestClient, "auth", lambda self, *a, **kw: calls.append(kw) or auth(self, *a, **kw))
+    client = make_client()
+    client.set_auth("first")
+    client.set_auth("first")
+    assert len(calls) == 1
+    client.set_auth("second")
+    client.set_auth("second", username = "user")
+    assert len(calls) == 3
+    assert client.postgrest.headers["Authorization"] == "Bearer second"
+    assert client.functions.headers["Authorization"] == "Bearer second"
+    assert client.auth.session.access_token == "second"
+
+
+async def run_test(Supabase):
     data = await Supabase.atable("profiles").select("*").execute()
     logger.info(f"Running test: {data}")
 
@@ -19,6 +170,19 @@ async def run_test():
     # delete user
 
 
+async def main():
+    from client import Supabase
+
+    # closes the connection pools once every scenario has run
+    async with Supabase:
+        await run_test(Supabase)
+
 
+if __name__ == "__main__":
+    # `asyncio.Runner` is only available on 3.11+
+    if hasattr(asyncio, "Runner"):
+        with asyncio.Runner() as runner:
+            runner.run(main())
+    else:
+        asyncio.run(main())
 
-asyncio.run(run_test())
\ No newline at end of file
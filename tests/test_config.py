@@ -0,0 +1,30 @@
+import json
+from aiosupabase.utils.config import SupabaseSettings
+
+
+def test_platform_urls_do_not_leak_into_fields():
+    settings = SupabaseSettings(url = "https://project.supabase.co", key = "a.b.c")
+    assert settings.is_platform is True
+    assert "is_platform" not in settings.dict()
+    assert json.loads(settings.json())["functions_url"] == "https://project.functions.supabase.co"
+
+
+def test_cached_settings_do_not_leak_into_fields():
+    settings = SupabaseSettings(url = "https://project.supabase.co", key = "a.b.c")
+    fields = settings.dict()
+    assert settings.default_headers is settings.default_headers
+    assert settings.rest_headers["Accept-Profile"] == "public"
+    assert settings.storage_headers["apiKey"] == "a.b.c"
+    assert settings.auth_defaults["auth_url"] == settings.auth_url
+    assert settings.limits.max_connections == settings.max_connections
+    assert settings.dict() == fields
+    json.loads(settings.json())
+
+
+def test_configure_resets_cached_settings():
+    settings = SupabaseSettings(url = "https://project.supabase.co", key = "a.b.c")
+    headers = settings.default_headers
+    settings.configure(headers = {"x-test": "1"}, max_connections = 7)
+    assert settings.default_headers is not headers
+    assert settings.rest_headers["x-test"] == "1"
+    assert settings.limits.max_connections == 7
@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import httpx
+
+from aiosupabase.schemas.funcs import FunctionsClient, InvokeOptions
+from aiosupabase.utils.config import SupabaseSettings
+
+
+URL = "https://project.supabase.co/functions/v1"
+
+
+def make_client(requests: list, default_headers: dict = None, **response) -> FunctionsClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, **(response or {"json": {"ok": True}}))
+
+    async def async_handler(request: httpx.Request) -> httpx.Response:
+        return handler(request)
+
+    return FunctionsClient(
+        url = URL,
+        key = "a.b.c",
+        headers = default_headers,
+        settings = SupabaseSettings(url = "https://project.supabase.co", key = "a.b.c"),
+        transport = httpx.MockTransport(handler),
+        async_transport = httpx.MockTransport(async_handler),
+    )
+
+
+def test_invoke_options_parse():
+    options = InvokeOptions(body = {"a": 1})
+    assert InvokeOptions.parse(options) is options
+    parsed = InvokeOptions.parse({"headers": {"x-a": "1"}, "body": [1], "responseType": "json"})
+    assert (parsed.headers, parsed.body, parsed.response_type) == ({"x-a": "1"}, [1], "json")
+    assert InvokeOptions.parse({"response_type": "stream"}).response_type == "stream"
+    empty = InvokeOptions.parse(None)
+    assert (empty.headers, empty.body, empty.response_type) == (None, None, None)
+
+
+def test_invoke_from_template():
+    requests = []
+    client = make_client(requests)
+    for _ in range(2):
+        result = client.invoke("hello", InvokeOptions(body = {"name": "a"}, response_type = "json"))
+        assert result == {"data": {"ok": True}, "error": None}
+    # the merged headers are resolved once per httpx client
+    assert len(client._request_templates) == 1
+    request = requests[-1]
+    assert request.method == "POST"
+    assert str(request.url) == f"{URL}/hello"
+    assert json.loads(request.content) == {"name": "a"}
+    assert request.headers["apiKey"] == "a.b.c"
+    assert request.headers["Authorization"] == "Bearer a.b.c"
+    # the client timeout is carried over to the request
+    assert request.extensions["timeout"] == client.session.sync_client.timeout.as_dict()
+
+
+def test_invoke_with_extra_headers():
+    requests = []
+    client = make_client(requests)
+    result = client.invoke("hello", {"headers": {"x-extra": "1"}})
+    assert json.loads(result["data"]) == {"ok": True}
+    assert requests[-1].headers["x-extra"] == "1"
+    assert requests[-1].headers["apiKey"] == "a.b.c"
+
+
+def test_invoke_after_set_auth():
+    requests = []
+    client = make_client(requests)
+    client.invoke("hello")
+    client.set_auth("token")
+    assert client._request_templates == {}
+    client.invoke("hello")
+    assert requests[-1].headers["Authorization"] == "Bearer token"
+
+
+def test_invoke_relay_error():
+    requests = []
+    client = make_client(requests, headers = {"x-relay-header": "true"}, text = "relay error")
+    assert client.invoke("hello") == {"data": None, "error": "relay error"}
+
+
+def test_invoke_invalid_json():
+    requests = []
+    client = make_client(requests, content = b"not json")
+    result = client.invoke("hello", {"responseType": "json"})
+    assert result["data"] is None
+    assert isinstance(result["error"], ValueError)
+
+
+def test_invoke_stream():
+    requests = []
+    client = make_client(requests, content = b"chunked body")
+    result = client.invoke("hello", {"responseType": "stream", "body": {"a": 1}})
+    assert result["error"] is None
+    # nothing is sent until the stream is entered
+    assert requests == []
+    with result["data"] as response:
+        assert b"".join(response.iter_bytes()) == b"chunked body"
+    assert json.loads(requests[-1].content) == {"a": 1}
+
+
+def test_async_invoke():
+    requests = []
+    client = make_client(requests, content = b"chunked body")
+
+    async def run():
+        result = await client.async_invoke("hello", InvokeOptions(body = {"a": 1}))
+        assert result == {"data": b"chunked body", "error": None}
+        result = await client.async_invoke("hello", {"responseType": "stream"})
+        async with result["data"] as response:
+            assert b"".join([chunk async for chunk in response.aiter_bytes()]) == b"chunked body"
+        await client.aclose()
+
+    asyncio.run(run())
+    assert [str(request.url) for request in requests] == [f"{URL}/hello"] * 2
+
+
+def test_invoke_json_content_type():
+    requests = []
+    # custom default headers, without a content type
+    client = make_client(requests, default_headers = {"x-client": "test"})
+    client.invoke("hello", {"body": {"a": 1}})
+    client.invoke("hello", {"body": {"a": 1}, "headers": {"x-extra": "1"}})
+    client.invoke("hello", {"body": "<a/>", "headers": {"content-type": "text/xml"}})
+    client.invoke("hello")
+    with client.invoke("hello", {"body": [1], "responseType": "stream"})["data"]: pass
+    content_types = [request.headers.get("content-type") for request in requests]
+    assert content_types == ["application/json", "application/json", "text/xml", None, "application/json"]
+
+    async def run():
+        await client.async_invoke("hello", {"body": {"a": 1}})
+        await client.async_invoke("hello", {"body": {"a": 1}, "headers": {"x-extra": "1"}})
+
+    asyncio.run(run())
+    assert [request.headers.get("content-type") for request in requests[-2:]] == ["application/json"] * 2
+
+
+def test_set_auth_before_clients_are_built():
+    requests = []
+    client = make_client(requests)
+    session = client.session
+    client.set_auth("token")
+    # the config stays a plain dict, so aiohttpx can keep updating it
+    assert type(session._config.headers) is dict
+    session._config.headers["x-later"] = "1"
+    assert session.sync_client.headers["Authorization"] == "Bearer token"
+
+    async def run():
+        await client.async_invoke("hello")
+
+    asyncio.run(run())
+    assert requests[-1].headers["Authorization"] == "Bearer token"
+    assert requests[-1].headers["x-later"] == "1"
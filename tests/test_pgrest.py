@@ -0,0 +1,120 @@
+import asyncio
+
+import httpx
+
+from aiosupabase.schemas.pgrest import SupabasePostgrestClient
+from aiosupabase.utils.config import SupabaseSettings
+
+
+def make_client(calls: list, **settings) -> SupabasePostgrestClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.method, request.url.path, request.url.query.decode()))
+        return httpx.Response(200, json = [{"id": len(calls)}])
+
+    async def async_handler(request: httpx.Request) -> httpx.Response:
+        return handler(request)
+
+    settings = SupabaseSettings(url = "https://project.supabase.co", key = "a.b.c", enable_query_cache = True, **settings)
+    return SupabasePostgrestClient(
+        settings = settings,
+        transport = httpx.MockTransport(handler),
+        async_transport = httpx.MockTransport(async_handler),
+    )
+
+
+def test_query_cache_hit():
+    calls = []
+    client = make_client(calls)
+    first = client.table("profiles").select("*").eq("id", 1).execute()
+    assert client.table("profiles").select("*").eq("id", 1).execute() is first
+    # a different query is a miss
+    client.table("profiles").select("*").eq("id", 2).execute()
+    assert len(calls) == 2
+
+
+def test_query_cache_expiry():
+    calls = []
+    client = make_client(calls)
+    client._query_cache.ttl = 0
+    for _ in range(2): client.table("profiles").select("*").execute()
+    assert len(calls) == 2
+
+
+def test_query_cache_lru_eviction():
+    calls = []
+    client = make_client(calls, query_cache_size = 2)
+    query = lambda table: client.table(table).select("*").execute()
+    query("a"), query("b")
+    # `a` becomes the most recently used, so `b` is evicted by `c`
+    query("a"), query("c")
+    assert len(calls) == 3
+    query("a")
+    assert len(calls) == 3
+    query("b")
+    assert len(calls) == 4
+
+
+def test_query_cache_invalidate():
+    calls = []
+    client = make_client(calls)
+    query = lambda table: client.table(table).select("*").execute()
+    query("a"), query("b")
+    client.invalidate("a")
+    query("a"), query("b")
+    assert len(calls) == 3
+    client.invalidate()
+    query("a"), query("b")
+    assert len(calls) == 5
+
+
+def test_query_cache_invalidated_by_writes():
+    calls = []
+    client = make_client(calls)
+    query = lambda: client.table("profiles").select("*").execute()
+    writes = (
+        lambda: client.table("profiles").insert({"id": 1}).execute(),
+        lambda: client.table("profiles").upsert({"id": 1}).execute(),
+        lambda: client.table("profiles").update({"name": "a"}).eq("id", 1).execute(),
+        lambda: client.table("profiles").delete().eq("id", 1).execute(),
+    )
+    for write in writes:
+        before = query()
+        write()
+        assert query() is not before
+    # writes to another table keep the cached reads
+    before = query()
+    client.table("other").insert({"id": 1}).execute()
+    assert query() is before
+
+
+def test_async_query_cache_invalidated_by_writes():
+    calls = []
+    client = make_client(calls)
+
+    async def run():
+        query = lambda: client.atable("profiles").select("*").execute()
+        first = await query()
+        assert await query() is first
+        await client.atable("profiles").insert({"id": 1}).execute()
+        second = await query()
+        assert second is not first
+        await client.atable("profiles").update({"name": "a"}).eq("id", 1).execute()
+        assert await query() is not second
+
+    asyncio.run(run())
+    assert [method for method, _, _ in calls] == ["GET", "POST", "GET", "PATCH", "GET"]
+
+
+def test_auth_header_before_and_after_first_use():
+    calls = []
+    client = make_client(calls)
+    client.auth("before")
+    # built after `auth()`, from the patched config
+    assert client.session.sync_client.headers["Authorization"] == "Bearer before"
+    client.auth("after")
+    # built before `auth()` and patched in place, or built after from the config
+    assert client.session.sync_client.headers["Authorization"] == "Bearer after"
+    assert client.session.async_client.headers["Authorization"] == "Bearer after"
+    client.auth("again")
+    for inner in (client.session.sync_client, client.session.async_client):
+        assert inner.headers["Authorization"] == "Bearer again"
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiosupabase.client import SupabaseClient
+from aiosupabase.schemas.rt import SupabaseRealtimeClient
+from aiosupabase.utils.config import SupabaseSettings
+
+
+def make_client() -> SupabaseClient:
+    client = SupabaseClient(settings = SupabaseSettings(url = "https://project.supabase.co", key = "a.b.c"))
+    # `set_channel` only checks the flag, no connection is opened
+    client.socket.connected = True
+    return client
+
+
+def test_realtime_client_reused():
+    client = make_client()
+    # the wrapper is dropped between calls, the channel must not be registered again
+    for _ in range(3): client.realtime("profiles")
+    assert len(client.socket.channels["realtime:public:profiles"]) == 1
+    assert client.realtime("profiles") is client.realtime("profiles")
+
+
+class FakeConnection:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message: str):
+        self.sent.append(message)
+
+
+def make_payload(type: str, record: dict = None, old_record: dict = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        schema = "public",
+        table = "profiles",
+        commit_timestamp = "2024-01-01T00:00:00Z",
+        type = type,
+        columns = [{"name": "id", "type": "int4"}, {"name": "name", "type": "text"}],
+        record = record,
+        old_record = old_record,
+    )
+
+
+def test_realtime_payload_records():
+    client = make_client()
+    client.socket.ws_connection = FakeConnection()
+    events = []
+
+    async def run():
+        rt = await client.realtime("profiles").async_on("*", events.append)
+        callback = rt.subscription.listeners[-1].callback
+        callback(make_payload("INSERT", record = {"id": "1", "name": "a"}))
+        callback(make_payload("UPDATE", record = {"id": "1", "name": "b"}, old_record = {"id": "1"}))
+        callback(make_payload("DELETE", old_record = {"id": "1"}))
+
+    asyncio.run(run())
+    assert len(client.socket.ws_connection.sent) == 1
+    insert, update, delete = events
+    assert insert == {
+        "schema": "public",
+        "table": "profiles",
+        "commit_timestamp": "2024-01-01T00:00:00Z",
+        "event_type": "INSERT",
+        # the records are converted using the column types
+        "new": {"id": 1, "name": "a"},
+        "old": {},
+    }
+    assert (update["new"], update["old"]) == ({"id": 1, "name": "b"}, {"id": 1})
+    # the old record is read from `old_record`
+    assert (delete["new"], delete["old"]) == ({}, {"id": 1})
+
+
+def test_realtime_payload_records_default():
+    records = SupabaseRealtimeClient.get_payload_records(make_payload("INSERT", record = {"id": "2"}))
+    assert records == {"new": {"id": 2}, "old": {}}